@@ -0,0 +1,26 @@
+# gunicorn.conf.py
+# Multi-worker launch for the FastAPI app:
+#   gunicorn -c gunicorn.conf.py main:app
+#
+# Each worker keeps its own in-memory indexes. A worker that sees a category's index files
+# rewritten by another worker's upload reloads them within settings.INDEX_RELOAD_INTERVAL.
+# Index updates, including the startup indexing of a knowledge base, take a per-category
+# file lock, so workers merge uploads one after another and embed each knowledge base once.
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app once in the master so workers share its memory copy-on-write
+preload_app = True
+
+def when_ready(server):
+    """Load the indexes in the master, before workers are forked"""
+    from main import vector_store_service
+    vector_store_service.preload()
+
+def post_worker_init(worker):
+    """Create the embedding model in each worker; its runtime thread pools do not survive fork()"""
+    from main import vector_store_service
+    _ = vector_store_service.embeddings
@@ -2,13 +2,19 @@
 import asyncio
 import logging
 import os
-import csv
-import json
-from typing import Dict, List
+import shutil
+import pandas as pd
+from typing import Dict, List, Optional
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+import orjson
 from pydantic import BaseModel
-from src.services.vector_store import VectorStoreService
+from src.config.settings import settings
+from src.services.llm_service import get_llm_service
+from src.services.vector_store import get_vector_store_service
+from src.utils.logger import flush_escalations
+from src.workflow.state import RAGResult
 from langchain.document_loaders import PyPDFLoader
 import tempfile
 
@@ -17,10 +23,11 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Define the FastAPI app
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
  
 # Initialize vector store service
-vector_store_service = VectorStoreService()
+vector_store_service = get_vector_store_service()
+llm_service = get_llm_service()
 
 class UploadResponse(BaseModel):
     success: bool
@@ -31,8 +38,60 @@ class EscalationLogResponse(BaseModel):
     success: bool
     data: List[Dict[str, str]]
     total_records: int
+
+class TicketRequest(BaseModel):
+    subject: str
+    description: str
+    ticket_id: Optional[str] = None
  
 
+async def process_pdf_upload(file: UploadFile, category: str) -> Optional[str]:
+    """Index a single uploaded PDF, returning its filename or None if skipped"""
+    # Check if file is PDF
+    if not file.filename.lower().endswith('.pdf'):
+        return None  # Skip non-PDF files
+        
+    # Create temporary file
+    temp_file_path = None
+    try:
+        # Stream the upload to a temporary file in chunks instead of reading it into memory
+        def stream_to_temp_file():
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
+                shutil.copyfileobj(file.file, temp_file, length=64 * 1024)
+                return temp_file.name
+        
+        temp_file_path = await asyncio.to_thread(stream_to_temp_file)
+        
+        # Load PDF using PyPDFLoader asynchronously
+        def load_pdf():
+            loader = PyPDFLoader(temp_file_path)
+            return loader.load()
+        
+        documents = await asyncio.to_thread(load_pdf)
+        
+        # Add to vector store with specified category
+        await vector_store_service.add_documents(documents=documents, category=category)
+        
+        logger.info("Successfully processed '%s' -> Category: '%s'", file.filename, category)
+        return file.filename
+        
+    except Exception as e:
+        logger.error("Error processing file %s: %s", file.filename, e)
+        raise e
+    finally:
+        # Cleanup temp file with retry logic asynchronously
+        if temp_file_path and await asyncio.to_thread(os.path.exists, temp_file_path):
+            try:
+                await asyncio.to_thread(os.unlink, temp_file_path)
+            except OSError as e:
+                logger.warning("Could not delete temp file %s: %s", temp_file_path, e)
+                # On Windows, sometimes files need time to be released
+                await asyncio.sleep(0.1)
+                try:
+                    await asyncio.to_thread(os.unlink, temp_file_path)
+                except OSError:
+                    pass  # Give up if still can't delete
+
 @app.post("/upload", response_model=UploadResponse)
 async def upload_documents(
     files: List[UploadFile] = File(...),
@@ -46,58 +105,31 @@ async def upload_documents(
                 detail="Vector store service not initialized"
             )
 
-        processed_files = []
-        
-        for file in files:
-            # Check if file is PDF
-            if not file.filename.lower().endswith('.pdf'):
-                continue  # Skip non-PDF files
-                
-            # Create temporary file
-            temp_file = None
-            try:
-                # Read file content
-                contents = await file.read()
-                
-                # Create temporary file asynchronously
-                def create_temp_file():
-                    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-                    temp_file.write(contents)
-                    temp_file.flush()
-                    temp_file.close()  # Close the file handle
-                    return temp_file.name
-                
-                temp_file_path = await asyncio.to_thread(create_temp_file)
-                
-                # Load PDF using PyPDFLoader asynchronously
-                def load_pdf():
-                    loader = PyPDFLoader(temp_file_path)
-                    return loader.load()
-                
-                documents = await asyncio.to_thread(load_pdf)
-                
-                # Add to vector store with specified category
-                await vector_store_service.add_documents(documents=documents, category=category)
-                processed_files.append(file.filename)
-                
-                print(f"Successfully processed '{file.filename}' -> Category: '{category}'")
-                
-            except Exception as e:
-                logger.error(f"Error processing file {file.filename}: {str(e)}")
-                raise e
-            finally:
-                # Cleanup temp file with retry logic asynchronously
-                if temp_file_path and await asyncio.to_thread(os.path.exists, temp_file_path):
-                    try:
-                        await asyncio.to_thread(os.unlink, temp_file_path)
-                    except OSError as e:
-                        logger.warning(f"Could not delete temp file {temp_file_path}: {e}")
-                        # On Windows, sometimes files need time to be released
-                        await asyncio.sleep(0.1)
-                        try:
-                            await asyncio.to_thread(os.unlink, temp_file_path)
-                        except OSError:
-                            pass  # Give up if still can't delete
+        # Process files concurrently, bounded so uploads don't exhaust the default thread pool
+        semaphore = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY)
+        
+        async def process_with_limit(file: UploadFile) -> Optional[str]:
+            async with semaphore:
+                return await process_pdf_upload(file, category)
+        
+        results = await asyncio.gather(
+            *(process_with_limit(file) for file in files),
+            return_exceptions=True
+        )
+        
+        processed_files = [result for result in results if isinstance(result, str)]
+        errors = [
+            f"{file.filename}: {result}"
+            for file, result in zip(files, results)
+            if isinstance(result, Exception)
+        ]
+        
+        if errors:
+            return UploadResponse(
+                success=False,
+                files_processed=processed_files,
+                error="; ".join(errors)
+            )
         
         if not processed_files:
             return UploadResponse(
@@ -112,7 +144,7 @@ async def upload_documents(
         )
         
     except Exception as e:
-        logger.error(f"Error in upload_documents: {str(e)}")
+        logger.error("Error in upload_documents: %s", e)
         return UploadResponse(
             success=False,
             files_processed=[],
@@ -125,17 +157,23 @@ async def get_escalation_log() -> EscalationLogResponse:
     try:
         csv_file_path = "data/escalation_log.csv"
         
-        if not os.path.exists(csv_file_path):
+        if not await asyncio.to_thread(os.path.exists, csv_file_path):
             raise HTTPException(
                 status_code=404,
                 detail="Escalation log file not found"
             )
         
-        data = []
-        with open(csv_file_path, 'r', encoding='utf-8') as file:
-            csv_reader = csv.DictReader(file)
-            for row in csv_reader:
-                data.append(row)
+        # Parse the memory-mapped CSV with pandas' C reader in a worker thread;
+        # every column stays a string and empty cells stay "" to match the response model
+        def read_csv_file():
+            try:
+                frame = pd.read_csv(csv_file_path, dtype=str, keep_default_na=False, memory_map=True, encoding='utf-8')
+            except pd.errors.EmptyDataError:
+                # A 0-byte log has no header row yet
+                return []
+            return frame.to_dict(orient='records')
+        
+        data = await asyncio.to_thread(read_csv_file)
         
         return EscalationLogResponse(
             success=True,
@@ -143,12 +181,67 @@ async def get_escalation_log() -> EscalationLogResponse:
             total_records=len(data)
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error reading escalation log: {str(e)}"
         )
 
+@app.post("/process_ticket/stream")
+async def process_ticket_stream(ticket: TicketRequest) -> StreamingResponse:
+    """Stream an unreviewed draft response for a ticket as Server-Sent Events"""
+    
+    async def event_stream():
+        try:
+            classification = await llm_service.classify_ticket(
+                subject=ticket.subject,
+                description=ticket.description
+            )
+            yield f"event: classification\ndata: {orjson.dumps(classification).decode()}\n\n"
+            
+            result = await vector_store_service.search(
+                query=f"{ticket.subject} {ticket.description}",
+                category=classification["category"],
+                k=5
+            )
+            # Same deduplicated, length-capped context the graph's draft node sends
+            context = RAGResult(
+                documents=result["documents"],
+                metadata=result["metadata"],
+                query_used=result["metadata"]["query_used"]
+            ).context
+            
+            async for token in llm_service.generate_draft_stream(
+                subject=ticket.subject,
+                description=ticket.description,
+                category=classification["category"],
+                context=context
+            ):
+                # JSON-encode each token so embedded newlines don't break SSE framing
+                yield f"data: {orjson.dumps(token).decode()}\n\n"
+            
+            yield "event: done\ndata: {}\n\n"
+            
+        except Exception as e:
+            logger.error("Error streaming ticket %s: %s", ticket.ticket_id, e)
+            yield f"event: error\ndata: {orjson.dumps(str(e)).decode()}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.on_event("startup")
+async def startup_event():
+    """Load the category indexes and open the LLM connection in the background so startup is not delayed"""
+    app.state.index_warmup = asyncio.create_task(vector_store_service.ensure_loaded())
+    app.state.llm_warmup = asyncio.create_task(llm_service.warmup())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Write out queued escalations and release pooled LLM connections"""
+    await flush_escalations()
+    await llm_service.aclose()
+
 @app.get("/health")
 async def health_check() -> Dict[str, str]:
     """Health check endpoint"""
@@ -1,9 +1,33 @@
 # config/settings.py
 import os
+import platform
 from dotenv import load_dotenv
 
 load_dotenv()
 
+def _cpu_flags() -> set:
+    """CPU feature flags from /proc/cpuinfo; empty where it is unavailable"""
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    return set(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return set()
+
+def _default_onnx_file() -> str:
+    """The quantized ONNX export whose kernels match this CPU"""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "onnx/model_qint8_arm64.onnx"
+    if "avx512_vnni" in _cpu_flags():
+        return "onnx/model_qint8_avx512_vnni.onnx"
+    # AVX2-only CPUs, and hosts whose flags cannot be read
+    return "onnx/model_quint8_avx2.onnx"
+
+# CPUs this process may run on; containers often report the host's core count via os.cpu_count()
+_AVAILABLE_CPUS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
 class Settings:
     # API Keys
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
@@ -11,11 +35,47 @@ class Settings:
     # Model Configuration
     GROQ_MODEL = "llama3-70b-8192"
     EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_BATCH_SIZE = 128
+    EMBEDDING_GPU_BATCH_SIZE = 256  # used instead of EMBEDDING_BATCH_SIZE when running on CUDA
+    EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE")  # None auto-selects cuda when available
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "onnx")  # "onnx" runs the int8 export on CPU, "torch" the fp32 model
+    EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE") or _default_onnx_file()
+    
+    # LLM Connection Configuration
+    GROQ_API_BASE = "https://api.groq.com/openai/v1"
+    LLM_MAX_CONNECTIONS = 100
+    LLM_MAX_KEEPALIVE_CONNECTIONS = 50
+    LLM_TIMEOUT = 30.0  # seconds
+    LLM_CONNECT_TIMEOUT = 5.0  # seconds
+    
+    # Keyword Classification Configuration
+    KEYWORD_CLASSIFIER_ENABLED = os.getenv("KEYWORD_CLASSIFIER_ENABLED", "true").lower() == "true"  # skip the LLM for unambiguous tickets
+    KEYWORD_CLASSIFIER_MIN_HITS = 2  # distinct keywords of a single category needed to skip the LLM
+    
+    # Caching Configuration
+    CLASSIFICATION_CACHE_SIZE = 1024
+    CLASSIFICATION_CACHE_TTL = 3600  # seconds
+    REFINED_QUERY_CACHE_SIZE = 1024
+    REFINED_QUERY_CACHE_TTL = 3600  # seconds
+    QUERY_EMBEDDING_CACHE_SIZE = 2048
+    SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"  # reuse approved responses of similar tickets as drafts
+    SEMANTIC_CACHE_THRESHOLD = 0.95  # cosine similarity needed to reuse an approved response
+    SEMANTIC_CACHE_SIZE = 512  # approved responses kept per category
+    SEARCH_CACHE_THRESHOLD = 0.95  # cosine similarity needed to reuse a previous query's search results
+    SEARCH_CACHE_SIZE = 1024  # search results kept per category
     
     # Graph Configuration
     MAX_RETRIES = 2
+    FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "false").lower() == "true"  # classify and draft in one LLM call
+    FAST_PATH_DOCS_PER_CATEGORY = 3  # context chunks per category given to the fused call
+    FUSED_REVIEW_ENABLED = os.getenv("FUSED_REVIEW_ENABLED", "false").lower() == "true"  # first draft is self-reviewed in the same LLM call
+    HEURISTIC_REVIEW_THRESHOLD = None  # e.g. 0.9 approves issue-free drafts scoring at least this (about 0.83 grounding) without an LLM review
+    HEURISTIC_REVIEW_MIN_CHARS = 200
+    HEURISTIC_REVIEW_MAX_CHARS = 3000
+    HEURISTIC_REVIEW_MIN_GROUNDING = 0.6  # share of the draft's longer words that must appear in the context
     VECTOR_STORE_PATH = "data/vector_store"
     ESCALATION_LOG_PATH = "data/escalation_log.csv"
+    ESCALATION_LOG_MAX_ITEMS = 5  # most recent drafts/reviews summarized per escalation row
     
     # Categories
     CATEGORIES = ["billing", "technical", "security", "general"]
@@ -30,5 +90,24 @@ class Settings:
 
     # Vector Store Configuration
     INDEX_DIR = "index_storage"
+    INDEX_RELOAD_INTERVAL = 5.0  # seconds between checks for index files rewritten by another worker
+    UPLOAD_CONCURRENCY = 4  # PDFs processed in parallel per upload request
+    FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "hnsw_flat")  # "hnsw_flat", "hnsw_fp16", "hnsw_sq8" (int8 codes) or "ivfpq"
+    HNSW_M = 32  # graph neighbours per node in the FAISS HNSW index
+    HNSW_EF_CONSTRUCTION = 200  # candidate list size while building the graph
+    HNSW_EF_SEARCH = 64  # candidate list size per query; higher trades latency for recall
+    IVF_NPROBE = 16  # inverted lists scanned per query by IVF indexes
+    IVFPQ_MIN_VECTORS = 10000  # smaller categories fall back to hnsw_sq8
+    FAISS_REFINE_K_FACTOR = None  # e.g. 4: quantized indexes fetch k * factor candidates and rescore them with exact fp32 vectors
+    EMBEDDING_PCA_DIM = None  # e.g. 128 to PCA-reduce vectors inside the index; None keeps full dimensions
+    # FAISS (OpenMP) and BM25 (thread pool) searches run side by side, so each defaults to half the CPUs
+    FAISS_OMP_THREADS = int(os.getenv("FAISS_OMP_THREADS", max(1, min(8, _AVAILABLE_CPUS // 2))))
+    BM25_THREADS = int(os.getenv("BM25_THREADS", max(1, _AVAILABLE_CPUS // 2)))
+    RRF_K = 60  # Reciprocal Rank Fusion smoothing constant
+    RETRIEVER_WEIGHTS = [0.5, 0.5]  # keyword (BM25), vector (FAISS)
+    RAG_CONTEXT_MAX_CHARS = 8000  # retrieved text passed to each draft/review prompt
+    NEAR_DUPLICATE_MAX_BITS = 3  # refined-search results whose SimHashes differ in at most this many bits are merged
+    CHUNK_SIZE = 250  # tokens; MiniLM truncates inputs past 256 including special tokens
+    CHUNK_OVERLAP = 32  # tokens
 
 settings = Settings()
\ No newline at end of file
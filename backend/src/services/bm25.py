@@ -0,0 +1,109 @@
+# services/bm25.py
+from collections import Counter
+from typing import BinaryIO, Dict, List, Sequence, Union
+
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+
+class BM25Index:
+    """
+    Okapi BM25 over a sparse document-term matrix.
+    Term frequencies are stored as CSR arrays with int32 term ids, and the
+    per-(document, term) BM25 weights are precomputed so that scoring a
+    query is a sparse column gather instead of a Python loop over documents.
+    """
+    def __init__(self, vocab: Dict[str, int], term_freqs: csr_matrix, doc_lens: np.ndarray, k1: float = 1.5, b: float = 0.75):
+        self.vocab = vocab
+        self.term_freqs = term_freqs
+        self.doc_lens = doc_lens
+        self.k1 = k1
+        self.b = b
+        self._weights = self._compute_weights()
+
+    @classmethod
+    def from_tokens(cls, tokenized_docs: List[List[str]]) -> "BM25Index":
+        """Build an index from tokenized documents"""
+        vocab: Dict[str, int] = {}
+        term_freqs = _count_matrix(tokenized_docs, vocab)
+        doc_lens = np.array([len(tokens) for tokens in tokenized_docs], dtype=np.float32)
+        return cls(vocab, term_freqs, doc_lens)
+
+    def add_documents(self, tokenized_docs: List[List[str]]) -> "BM25Index":
+        """Return a new index containing these documents appended to the current ones"""
+        vocab = dict(self.vocab)
+        new_freqs = _count_matrix(tokenized_docs, vocab)
+
+        old_freqs = self.term_freqs.copy()
+        old_freqs.resize((old_freqs.shape[0], len(vocab)))
+        term_freqs = vstack([old_freqs, new_freqs], format="csr", dtype=np.float32)
+
+        doc_lens = np.concatenate([
+            self.doc_lens,
+            np.array([len(tokens) for tokens in tokenized_docs], dtype=np.float32)
+        ])
+        return BM25Index(vocab, term_freqs, doc_lens, self.k1, self.b)
+
+    def _compute_weights(self):
+        """Precompute BM25 term weights, stored column-major for per-term gathers"""
+        tf = self.term_freqs
+        num_docs = tf.shape[0]
+
+        doc_freqs = np.bincount(tf.indices, minlength=tf.shape[1])
+        idf = np.log1p((num_docs - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+
+        avg_doc_len = self.doc_lens.mean() if num_docs else 1.0
+        nnz_doc_lens = np.repeat(self.doc_lens, np.diff(tf.indptr))
+        norm = self.k1 * (1 - self.b + self.b * nnz_doc_lens / max(avg_doc_len, 1.0))
+        data = idf[tf.indices] * tf.data * (self.k1 + 1) / (tf.data + norm)
+
+        return csr_matrix((data.astype(np.float32), tf.indices, tf.indptr), shape=tf.shape).tocsc()
+
+    def get_scores(self, query_tokens: Sequence[str]) -> np.ndarray:
+        """BM25 score of every document for the query"""
+        term_ids = [self.vocab[token] for token in query_tokens if token in self.vocab]
+        if not term_ids:
+            return np.zeros(self.term_freqs.shape[0], dtype=np.float32)
+
+        unique_ids, counts = np.unique(np.array(term_ids, dtype=np.int32), return_counts=True)
+        return self._weights[:, unique_ids] @ counts.astype(np.float32)
+
+    def save(self, file: Union[str, BinaryIO]):
+        """Write the vocabulary and term-frequency arrays to a single .npz file (path or open binary file)"""
+        np.savez(
+            file,
+            # Fixed-width unicode array ordered by term id, so loading needs no pickle
+            vocab=np.array(list(self.vocab), dtype=np.str_),
+            data=self.term_freqs.data,
+            indices=self.term_freqs.indices.astype(np.int32),
+            indptr=self.term_freqs.indptr,
+            doc_lens=self.doc_lens
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Rebuild an index from arrays written by `save`"""
+        with np.load(path, allow_pickle=False) as arrays:
+            vocab = {term: term_id for term_id, term in enumerate(arrays["vocab"].tolist())}
+            term_freqs = csr_matrix(
+                (arrays["data"], arrays["indices"], arrays["indptr"]),
+                shape=(len(arrays["indptr"]) - 1, len(vocab))
+            )
+            doc_lens = arrays["doc_lens"]
+        return cls(vocab, term_freqs, doc_lens)
+
+def _count_matrix(tokenized_docs: List[List[str]], vocab: Dict[str, int]) -> csr_matrix:
+    """Count term occurrences per document, adding unseen terms to `vocab`"""
+    indptr = [0]
+    indices: List[int] = []
+    data: List[int] = []
+
+    for tokens in tokenized_docs:
+        counts = Counter(vocab.setdefault(token, len(vocab)) for token in tokens)
+        indices.extend(counts.keys())
+        data.extend(counts.values())
+        indptr.append(len(indices))
+
+    return csr_matrix(
+        (np.array(data, dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+        shape=(len(tokenized_docs), len(vocab))
+    )
@@ -0,0 +1,56 @@
+# services/chunk_store.py
+import mmap
+from typing import BinaryIO, Iterator, List, Union
+
+import numpy as np
+
+class ChunkStore:
+    """
+    Read-only sequence of chunk texts stored as one UTF-8 blob plus an offset table.
+    Loaded stores memory-map the blob, so texts are only decoded when accessed
+    and the pages are shared between forked worker processes.
+    """
+    def __init__(self, blob: Union[bytes, mmap.mmap], offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    @classmethod
+    def from_texts(cls, texts: List[str]) -> "ChunkStore":
+        """Build an in-memory store from a list of texts"""
+        encoded = [text.encode("utf-8") for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(data) for data in encoded], out=offsets[1:])
+        return cls(b"".join(encoded), offsets)
+
+    def extend(self, texts: List[str]) -> "ChunkStore":
+        """Return a new in-memory store with these texts appended"""
+        appended = ChunkStore.from_texts(texts)
+        offsets = np.concatenate([self._offsets, appended._offsets[1:] + self._offsets[-1]])
+        return ChunkStore(self._blob[:] + appended._blob, offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self._blob[self._offsets[i]:self._offsets[i + 1]].decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def save_blob(self, f: BinaryIO):
+        """Write the concatenated UTF-8 texts"""
+        f.write(self._blob[:])
+
+    def save_offsets(self, f: BinaryIO):
+        """Write the (len + 1,) int64 byte offset table"""
+        np.save(f, self._offsets)
+
+    @classmethod
+    def load(cls, blob_path: str, offsets_path: str) -> "ChunkStore":
+        """Memory-map a store written by `save_blob` and `save_offsets`"""
+        offsets = np.load(offsets_path, mmap_mode="r")
+        with open(blob_path, "rb") as f:
+            # Empty files cannot be mapped
+            blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if offsets[-1] else b""
+        return cls(blob, offsets)
@@ -0,0 +1,70 @@
+# services/embeddings.py
+import logging
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """
+    Embeds texts with a SentenceTransformer model in large batches.
+    Runs in fp16 when a CUDA device is available. On CPU it can run an int8
+    quantized ONNX export through ONNX Runtime instead of fp32 PyTorch.
+    """
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int = 128,
+        gpu_batch_size: Optional[int] = None,
+        device: Optional[str] = None,
+        backend: str = "torch",
+        onnx_file_name: Optional[str] = None
+    ):
+        # Imported here so that importing this module does not pull in torch
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        # fp16 GPU forward passes stay efficient at much larger batches than CPU ones
+        self.batch_size = gpu_batch_size if gpu_batch_size and self.device.startswith("cuda") else batch_size
+
+        if backend == "onnx" and self.device == "cpu":
+            self.model = SentenceTransformer(
+                model_name,
+                device=self.device,
+                backend="onnx",
+                model_kwargs={"file_name": onnx_file_name} if onnx_file_name else None
+            )
+        else:
+            backend = "torch"
+            # Load the weights directly in fp16 on GPU rather than converting an fp32 copy
+            self.model = SentenceTransformer(
+                model_name,
+                device=self.device,
+                model_kwargs={"torch_dtype": torch.float16} if self.device.startswith("cuda") else None
+            )
+        logger.info(f"Embedding model '{model_name}' loaded on {self.device} ({backend})")
+
+    @property
+    def tokenizer(self):
+        """The model's Hugging Face tokenizer"""
+        return self.model.tokenizer
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts into a float32 (n, dim) matrix of L2-normalized vectors"""
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return vectors.astype(np.float32, copy=False)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
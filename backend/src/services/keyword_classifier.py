@@ -0,0 +1,53 @@
+# services/keyword_classifier.py
+import re
+from typing import Any, Dict, Optional, Set
+
+from src.config.settings import settings
+
+# Keywords that on their own point clearly at one category; "general" is left to the LLM
+CATEGORY_KEYWORDS = {
+    "billing": (
+        "refund", "refunds", "refunded", "invoice", "invoices", "billing", "billed", "charged",
+        "overcharged", "payment", "payments", "subscription", "pricing", "receipt", "credit card"
+    ),
+    "technical": (
+        "bug", "error", "errors", "crash", "crashes", "crashing", "api", "500", "timeout",
+        "exception", "endpoint", "sdk", "integration", "not working", "broken"
+    ),
+    "security": (
+        "password", "2fa", "two-factor", "breach", "unauthorized", "hacked", "suspicious",
+        "phishing", "compromised", "locked out", "data privacy", "gdpr"
+    )
+}
+
+# One named group per category, so a ticket is scanned once for every keyword list
+_KEYWORD_RE = re.compile(
+    r"\b(?:%s)\b" % "|".join(
+        f"(?P<{category}>%s)" % "|".join(
+            re.escape(keyword).replace(r"\ ", r"\s+") for keyword in sorted(keywords, key=len, reverse=True)
+        )
+        for category, keywords in CATEGORY_KEYWORDS.items()
+    ),
+    re.IGNORECASE
+)
+
+def classify_by_keywords(subject: str, description: str) -> Optional[Dict[str, Any]]:
+    """
+    Classify a ticket without the LLM when it matches at least KEYWORD_CLASSIFIER_MIN_HITS
+    distinct keywords of exactly one category. Returns None when the ticket is ambiguous.
+    """
+    hits: Dict[str, Set[str]] = {}
+    for match in _KEYWORD_RE.finditer(f"{subject}\n{description}"):
+        hits.setdefault(match.lastgroup, set()).add(" ".join(match.group().lower().split()))
+
+    if len(hits) != 1:
+        return None
+    category, keywords = next(iter(hits.items()))
+    if len(keywords) < settings.KEYWORD_CLASSIFIER_MIN_HITS:
+        return None
+
+    return {
+        "category": category,
+        "confidence": 0.9,
+        "reasoning": f"Keyword match: {', '.join(sorted(keywords))}"
+    }
@@ -1,41 +1,139 @@
 # services/llm_service.py
-import json
+import re
 import logging
-from typing import List, Dict, Any
+import functools
+from typing import List, Dict, Any, AsyncIterator, Optional
+import httpx
+import orjson
 from langchain_groq import ChatGroq
-from langchain.schema import HumanMessage, SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
 from src.config.settings import settings
+from src.prompts.classification import CLASSIFICATION_PROMPT
+from src.prompts.draft_generation import DRAFT_GENERATION_PROMPT, REDRAFT_PROMPT, CLASSIFY_AND_DRAFT_PROMPT, DRAFT_AND_REVIEW_PROMPT
+from src.prompts.review import REVIEW_PROMPT
 from src.prompts.query_refinement import QUERY_REFINEMENT_PROMPT
+from src.services.keyword_classifier import classify_by_keywords
+from src.utils.cache import TTLCache, content_key, mask_ids
+from src.workflow.state import ClassifiedDraft, ReviewedDraft, ReviewResult
 
 logger = logging.getLogger(__name__)
 
-logger = logging.getLogger(__name__)
+def _classification_key(subject: str, description: str) -> bytes:
+    """Cache key for a ticket, ignoring ID-like tokens that do not affect its category"""
+    return content_key(mask_ids(subject), mask_ids(description))
+
+# The queries array of a query refinement response, for when the full object does not parse
+_REFINED_QUERIES_RE = re.compile(r'"refined_queries"\s*:\s*(?P<queries>\[[^\]]*\])')
+
+def _extract_json(content: str) -> str:
+    """Strip any prose the model wrapped around a JSON object"""
+    content = content.strip()
+    if not content.startswith('{'):
+        # Same span as a greedy r"\{.*\}" search, found with two linear scans and no backtracking
+        start, end = content.find('{'), content.rfind('}')
+        if start != -1 and end > start:
+            content = content[start:end + 1]
+    return content
 
 class LLMService:
     def __init__(self):
+        # One pooled client so every call reuses keep-alive connections to Groq
+        self._http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            timeout=httpx.Timeout(settings.LLM_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT),
+            # Concurrent requests multiplex over one connection instead of opening more
+            http2=True
+        )
         self.llm = ChatGroq(
             groq_api_key=settings.GROQ_API_KEY,
             model_name=settings.GROQ_MODEL,
             temperature=0.1,
-            max_tokens=2048
+            max_tokens=2048,
+            http_async_client=self._http_client
         )
+        # Reviews use Groq tool calling to return the ReviewResult schema directly
+        self._review_llm = self.llm.with_structured_output(ReviewResult)
+        # The fast path classifies and drafts in one call, returning the ClassifiedDraft schema
+        self._classify_draft_llm = self.llm.with_structured_output(ClassifiedDraft)
+        # Fused first drafts come back with their self-review as the ReviewedDraft schema
+        self._draft_review_llm = self.llm.with_structured_output(ReviewedDraft)
+        self._classification_cache = TTLCache(
+            maxsize=settings.CLASSIFICATION_CACHE_SIZE,
+            ttl=settings.CLASSIFICATION_CACHE_TTL
+        )
+        self._refined_query_cache = TTLCache(
+            maxsize=settings.REFINED_QUERY_CACHE_SIZE,
+            ttl=settings.REFINED_QUERY_CACHE_TTL
+        )
+        
+        # Prompt templates are parsed once and reused for every call
+        self._classification_template = ChatPromptTemplate.from_messages([
+            ("human", CLASSIFICATION_PROMPT)
+        ])
+        self._draft_template = ChatPromptTemplate.from_messages([
+            ("human", DRAFT_GENERATION_PROMPT)
+        ])
+        self._classify_draft_template = ChatPromptTemplate.from_messages([
+            ("human", CLASSIFY_AND_DRAFT_PROMPT)
+        ])
+        self._draft_review_template = ChatPromptTemplate.from_messages([
+            ("human", DRAFT_AND_REVIEW_PROMPT)
+        ])
+        self._redraft_template = ChatPromptTemplate.from_messages([
+            ("human", REDRAFT_PROMPT)
+        ])
+        self._review_template = ChatPromptTemplate.from_messages([
+            ("system", "You are a quality assurance reviewer. Always respond with valid JSON."),
+            ("human", REVIEW_PROMPT)
+        ])
+        self._query_refinement_template = ChatPromptTemplate.from_messages([
+            ("system", "You are an expert at analyzing feedback and generating better search queries. Always respond with valid JSON."),
+            ("human", QUERY_REFINEMENT_PROMPT)
+        ])
+    
+    async def warmup(self):
+        """Open a pooled connection to Groq ahead of the first ticket (TLS + HTTP/2 setup)"""
+        try:
+            await self._http_client.get(
+                f"{settings.GROQ_API_BASE}/models",
+                headers={"Authorization": f"Bearer {settings.GROQ_API_KEY}"}
+            )
+        except httpx.HTTPError as e:
+            logger.warning("LLM connection warmup failed: %s", e)
+    
+    async def aclose(self):
+        """Close pooled HTTP connections"""
+        await self._http_client.aclose()
     
     async def classify_ticket(self, subject: str, description: str) -> Dict[str, Any]:
         """Classify support ticket into categories"""
-        from src.prompts.classification import CLASSIFICATION_PROMPT
+        cache_key = _classification_key(subject, description)
+        cached = self._classification_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Classification cache hit")
+            return dict(cached)
+        
+        # Tickets that clearly match one category's keywords do not need the LLM
+        if settings.KEYWORD_CLASSIFIER_ENABLED:
+            result = classify_by_keywords(subject, description)
+            if result is not None:
+                logger.info(f"Classified by keywords as '{result['category']}'")
+                return result
         
         try:
-            prompt = CLASSIFICATION_PROMPT.format(
+            messages = self._classification_template.format_messages(
                 subject=subject,
                 description=description
             )
-            
-            messages = [HumanMessage(content=prompt)]
             response = await self.llm.ainvoke(messages)
             
             # Parse JSON response
-            result = json.loads(response.content.strip())
-            return result
+            result = orjson.loads(_extract_json(response.content))
+            self._classification_cache.set(cache_key, result)
+            return dict(result)
             
         except Exception as e:
             logger.error(f"Classification error: {e}")
@@ -57,11 +155,9 @@ class LLMService:
         reviewer_feedback: str = ""
     ) -> str:
         """Generate response draft"""
-        from src.prompts.draft_generation import DRAFT_GENERATION_PROMPT, REDRAFT_PROMPT
-        
         try:
             if is_redraft:
-                prompt = REDRAFT_PROMPT.format(
+                messages = self._redraft_template.format_messages(
                     subject=subject,
                     description=description,
                     category=category,
@@ -70,14 +166,13 @@ class LLMService:
                     context=context
                 )
             else:
-                prompt = DRAFT_GENERATION_PROMPT.format(
+                messages = self._draft_template.format_messages(
                     subject=subject,
                     description=description,
                     category=category,
                     context=context
                 )
             
-            messages = [HumanMessage(content=prompt)]
             response = await self.llm.ainvoke(messages)
             
             return response.content.strip()
@@ -86,6 +181,69 @@ class LLMService:
             logger.error(f"Draft generation error: {e}")
             return "I apologize, but I'm experiencing technical difficulties. Please contact our support team directly for assistance."
     
+    async def classify_and_draft(
+        self, 
+        subject: str, 
+        description: str, 
+        context: str
+    ) -> Optional[Dict[str, Any]]:
+        """Classify a ticket and draft its response in one call; None if the call fails"""
+        try:
+            messages = self._classify_draft_template.format_messages(
+                subject=subject,
+                description=description,
+                context=context
+            )
+            
+            result = await self._classify_draft_llm.ainvoke(messages)
+            return result.model_dump()
+            
+        except Exception as e:
+            logger.error(f"Classify-and-draft error: {e}")
+            return None
+    
+    async def generate_and_review(
+        self, 
+        subject: str, 
+        description: str, 
+        category: str, 
+        context: str
+    ) -> Optional[Dict[str, Any]]:
+        """Generate a first draft and its self-review in one call; None if the call fails"""
+        try:
+            messages = self._draft_review_template.format_messages(
+                subject=subject,
+                description=description,
+                category=category,
+                context=context
+            )
+            
+            result = await self._draft_review_llm.ainvoke(messages)
+            return result.model_dump()
+            
+        except Exception as e:
+            logger.error(f"Draft-and-review error: {e}")
+            return None
+    
+    async def generate_draft_stream(
+        self, 
+        subject: str, 
+        description: str, 
+        category: str, 
+        context: str
+    ) -> AsyncIterator[str]:
+        """Stream the initial response draft as it is generated"""
+        messages = self._draft_template.format_messages(
+            subject=subject,
+            description=description,
+            category=category,
+            context=context
+        )
+        
+        async for chunk in self.llm.astream(messages):
+            if chunk.content:
+                yield chunk.content
+    
     async def review_draft(
         self, 
         subject: str, 
@@ -95,10 +253,8 @@ class LLMService:
         context: str
     ) -> Dict[str, Any]:
         """Review draft response for quality and compliance"""
-        from src.prompts.review import REVIEW_PROMPT
-        
         try:
-            prompt = REVIEW_PROMPT.format(
+            messages = self._review_template.format_messages(
                 subject=subject,
                 description=description,
                 category=category,
@@ -106,32 +262,9 @@ class LLMService:
                 context=context
             )
             
-            messages = [
-                SystemMessage(content="You are a quality assurance reviewer. Always respond with valid JSON."),
-                HumanMessage(content=prompt)
-            ]
-            response = await self.llm.ainvoke(messages)
-            
-            # Clean up response content
-            content = response.content.strip()
-            # Try to find JSON in the response if it's wrapped in other text
-            if not content.startswith('{'):
-                import re
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    content = json_match.group(0)
-            
-            try:
-                # Parse JSON response
-                result = json.loads(content)
-                # Validate required fields
-                required_fields = {"approved", "score", "feedback", "issues"}
-                if not all(field in result for field in required_fields):
-                    raise ValueError("Missing required fields in response")
-                return result
-            except json.JSONDecodeError as je:
-                logger.error(f"Failed to parse review response as JSON: {je}\nResponse: {content}")
-                raise
+            # Structured output returns a validated ReviewResult, no JSON scraping needed
+            review = await self._review_llm.ainvoke(messages)
+            return review.model_dump()
             
         except Exception as e:
             logger.error(f"Review error: {e}")
@@ -164,35 +297,38 @@ class LLMService:
             List of refined search queries
         """
         logger.info(f"Generating refined queries based on feedback")
+        cache_key = content_key(query, category, feedback)
+        cached = self._refined_query_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Refined query cache hit")
+            return list(cached)
+        
         try:
-            logger.info(f"Query: {query}")
+            logger.debug("Query: %s", query)
 
-            prompt = QUERY_REFINEMENT_PROMPT.format(
+            messages = self._query_refinement_template.format_messages(
                 query=query,
                 category=category,
                 feedback=feedback,
             )
-            logger.info(f"Prompt: prompt template here")
-
-            messages = [
-                SystemMessage(content="You are an expert at analyzing feedback and generating better search queries. Always respond with valid JSON."),
-                HumanMessage(content=prompt)
-            ]
-            logger.info(f"Prompt: {prompt}")
+            logger.debug("Prompt: %s", messages[-1].content)
 
             response = await self.llm.ainvoke(messages)
             content = response.content.strip()
             
-            logger.info(f"Response: {response}")
+            logger.debug("Response: %s", response)
             # Clean up response content to extract JSON
-            if not content.startswith('{'):
-                import re
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    content = json_match.group(0)
+            content = _extract_json(content)
             
             try:
-                result = json.loads(content)
+                try:
+                    result = orjson.loads(content)
+                except orjson.JSONDecodeError:
+                    # Malformed wrapper, e.g. a truncated analysis object: salvage just the queries array
+                    match = _REFINED_QUERIES_RE.search(content)
+                    if match is None:
+                        raise
+                    result = {"refined_queries": orjson.loads(match["queries"])}
                 
                 # Validate response structure
                 if "refined_queries" not in result:
@@ -211,12 +347,13 @@ class LLMService:
                     raise ValueError("No valid queries generated")
                 
                 logger.info(f"Generated {len(valid_queries)} refined queries based on feedback")
-                logger.debug(f"Analysis: {result.get('analysis', {})}")
+                logger.debug("Analysis: %s", result.get('analysis', {}))
                 
                 # Return max 5 queries to avoid too many searches
+                self._refined_query_cache.set(cache_key, valid_queries[:5])
                 return valid_queries[:5]
                 
-            except json.JSONDecodeError as je:
+            except orjson.JSONDecodeError as je:
                 logger.error(f"Failed to parse query refinement response as JSON: {je}\nResponse: {content}")
                 raise
                 
@@ -244,4 +381,9 @@ class LLMService:
             fallback_queries.append(f"step by step {base_query}")
             
             logger.warning(f"Using fallback queries due to error in query generation")
-            return fallback_queries[:4]
\ No newline at end of file
+            return fallback_queries[:4]
+
+@functools.cache
+def get_llm_service() -> LLMService:
+    """Process-wide LLM service, so the API and the workflow nodes share one connection pool"""
+    return LLMService()
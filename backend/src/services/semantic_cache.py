@@ -0,0 +1,55 @@
+# services/semantic_cache.py
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class SemanticCache:
+    """
+    Per-category cache of approved responses keyed by ticket embedding.
+    A lookup hits when a cached ticket's cosine similarity to the new one
+    reaches `threshold`; embeddings must be L2-normalized.
+    """
+    def __init__(self, threshold: float = 0.95, maxsize: int = 512):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        # Per category: a (maxsize, dim) ring buffer of embeddings, the entries and the number of inserts
+        self._embeddings: Dict[str, np.ndarray] = {}
+        self._entries: Dict[str, List[Any]] = {}
+        self._inserted: Dict[str, int] = {}
+
+    def lookup(self, embedding: np.ndarray, category: str) -> Optional[Any]:
+        """Return the entry of the most similar cached ticket, or None below the threshold"""
+        matrix = self._embeddings.get(category)
+        if matrix is None:
+            return None
+
+        similarities = matrix[:min(self._inserted[category], self.maxsize)] @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+
+        logger.info("Semantic cache hit in '%s' (similarity %.3f)", category, similarities[best])
+        return self._entries[category][best]
+
+    def store(self, embedding: np.ndarray, category: str, entry: Any):
+        """Cache an entry, overwriting the oldest one in the category once `maxsize` are stored"""
+        matrix = self._embeddings.get(category)
+        if matrix is None:
+            matrix = self._embeddings[category] = np.empty((self.maxsize, embedding.shape[-1]), dtype=np.float32)
+            self._entries[category] = [None] * self.maxsize
+            self._inserted[category] = 0
+
+        slot = self._inserted[category] % self.maxsize
+        matrix[slot] = embedding.reshape(-1)
+        self._entries[category][slot] = entry
+        self._inserted[category] += 1
+
+    def invalidate_prefix(self, prefix: str):
+        """Drop every category whose key starts with `prefix`"""
+        for category in [category for category in self._entries if category.startswith(prefix)]:
+            del self._entries[category]
+            del self._embeddings[category]
+            del self._inserted[category]
@@ -1,118 +1,622 @@
 # services/vector_store.py
 import os
-import pickle
+import re
+import glob
 import logging
+import time
 import asyncio
-from typing import List, Dict, Any, Optional
+import tempfile
+import functools
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache
+from typing import Callable, Iterator, List, Dict, Any, Optional, BinaryIO, Tuple
 
-from langchain.retrievers import BM25Retriever, EnsembleRetriever
-from langchain.vectorstores import FAISS
+import faiss
+import numpy as np
+import orjson
 from langchain.schema import Document
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from src.config.settings import settings
+from src.services.bm25 import BM25Index
+from src.services.chunk_store import ChunkStore
+from src.services.embeddings import SentenceTransformerEmbeddings
+from src.services.semantic_cache import SemanticCache
+from src.utils.cache import TTLCache, content_key, simhash
+
+try:
+    import fcntl
+except ImportError:  # Windows: index updates are only serialized within a process
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+_TOKEN_RE = re.compile(r"\w+")
+
+# Very common words carry almost no BM25 signal but have the densest postings
+_STOP_WORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "can", "do", "for",
+    "from", "has", "have", "how", "i", "if", "in", "is", "it", "its", "me", "my",
+    "of", "on", "or", "our", "so", "that", "the", "their", "this", "to", "was",
+    "we", "were", "what", "when", "which", "will", "with", "you", "your"
+))
+
+def _tokenize(text: str) -> List[str]:
+    """Lowercase word tokenization shared by BM25 indexing and querying"""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOP_WORDS]
+
+@lru_cache(maxsize=1024)
+def _tokenize_query(query: str) -> tuple:
+    """Cached query tokenization; the same queries recur across retries and refined searches"""
+    return tuple(_tokenize(query))
+
+_embeddings: Optional[SentenceTransformerEmbeddings] = None
+_embeddings_lock = threading.Lock()
+
+def _embedding_config() -> Dict[str, Optional[str]]:
+    """What the stored vectors depend on; an index built under any other setup is re-embedded"""
+    return {
+        'embedding_model': settings.EMBEDDING_MODEL,
+        'embedding_backend': settings.EMBEDDING_BACKEND,
+        'embedding_onnx_file': settings.EMBEDDING_ONNX_FILE if settings.EMBEDDING_BACKEND == "onnx" else None
+    }
+
+def get_embeddings() -> SentenceTransformerEmbeddings:
+    """Process-wide embedding model, loaded once on first use"""
+    global _embeddings
+    if _embeddings is None:
+        # Embeddings are also requested from worker threads, so guard with a thread lock
+        with _embeddings_lock:
+            if _embeddings is None:
+                logger.info("Loading embedding model '%s'...", settings.EMBEDDING_MODEL)
+                _embeddings = SentenceTransformerEmbeddings(
+                    model_name=settings.EMBEDDING_MODEL,
+                    batch_size=settings.EMBEDDING_BATCH_SIZE,
+                    gpu_batch_size=settings.EMBEDDING_GPU_BATCH_SIZE,
+                    device=settings.EMBEDDING_DEVICE,
+                    backend=settings.EMBEDDING_BACKEND,
+                    onnx_file_name=settings.EMBEDDING_ONNX_FILE
+                )
+    return _embeddings
+
+def _read_text_files(directory: str) -> List[Document]:
+    """Read every .txt file in a directory in parallel"""
+    paths = sorted(glob.glob(os.path.join(directory, "*.txt")))
+    if not paths:
+        return []
+
+    def read(path: str) -> str:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    with ThreadPoolExecutor(max_workers=min(32, len(paths))) as executor:
+        texts = list(executor.map(read, paths))
+    return [Document(page_content=text, metadata={"source": path}) for path, text in zip(paths, texts)]
+
+@contextlib.contextmanager
+def _atomic_path(path: str) -> Iterator[str]:
+    """
+    Yield a unique temporary sibling of path and rename it into place once written, so
+    concurrent writers never share a temp file. Readers that memory-mapped the previous
+    file (the chunk texts) keep their unlinked copy instead of faulting.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+def _atomic_write(path: str, write: Callable[[BinaryIO], None]):
+    """Write a file through _atomic_path"""
+    with _atomic_path(path) as tmp_path:
+        with open(tmp_path, "wb") as f:
+            write(f)
+
+@contextlib.contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Hold an exclusive lock on path, shared by every process using the same INDEX_DIR"""
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def _reciprocal_rank_fusion(rankings: List[np.ndarray], weights: List[float], num_docs: int) -> np.ndarray:
+    """
+    Fuse several rankings of document ids with weighted Reciprocal Rank Fusion.
+    Returns the ids of every ranked document ordered by fused score.
+    """
+    scores = np.zeros(num_docs, dtype=np.float32)
+    for ranking, weight in zip(rankings, weights):
+        ranking = ranking[ranking >= 0]
+        scores[ranking] += weight / (settings.RRF_K + np.arange(1, len(ranking) + 1, dtype=np.float32))
+
+    candidates = np.flatnonzero(scores)
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+class CategoryIndex:
+    """
+    Hybrid (keyword + vector) index over the chunks of a single category.
+    The FAISS index and the chunk corpus are stored as separate artifacts.
+    """
+    def __init__(self, index: faiss.Index, texts: ChunkStore, metadatas: List[Dict[str, Any]], bm25: BM25Index):
+        self.index = index
+        # A PCA-reduced index wraps the search index in an IndexPreTransform, a rescored one in an IndexRefine
+        search_index = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexPreTransform) else index
+        if isinstance(search_index, faiss.IndexRefine):
+            search_index = faiss.downcast_index(search_index.base_index)
+        if isinstance(search_index, faiss.IndexHNSW):
+            search_index.hnsw.efSearch = settings.HNSW_EF_SEARCH
+        elif isinstance(search_index, faiss.IndexIVF):
+            search_index.nprobe = settings.IVF_NPROBE
+        self.texts = texts
+        self.metadatas = metadatas
+        self.bm25 = bm25
+
+    @cached_property
+    def chunk_hashes(self) -> set:
+        """Content hashes of the indexed chunks, used to skip re-uploaded text"""
+        # Computed on first upload rather than at load, so loading never decodes every chunk
+        return {content_key(text) for text in self.texts}
+
+    def keyword_search(self, query: str, k: int) -> np.ndarray:
+        """Return the ids of the top-k BM25 matches"""
+        scores = self.bm25.get_scores(_tokenize_query(query))
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return top[scores[top] > 0]
+
+    def vector_search(self, query_embeddings: np.ndarray, k: int) -> np.ndarray:
+        """Return a (num_queries, k) array with the ids of each query's nearest chunks (-1 padded by FAISS)"""
+        _, indices = self.index.search(query_embeddings, min(k, self.index.ntotal))
+        return indices
+
 class VectorStoreService:
     """
     A service for handling hybrid search (keyword + vector) over documents.
-    It creates, saves, and loads retrievers for different categories.
+    It creates, saves, and loads per-category FAISS + BM25 indexes.
     """
     def __init__(self):
         # Ensure the directory for storing index files exists
         self._ensure_index_dir()
         
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=settings.EMBEDDING_MODEL,
-            model_kwargs={'device': 'cpu'}
-        )
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200
+        # FAISS and BM25 get separate thread budgets so concurrent searches do not oversubscribe the cores
+        faiss.omp_set_num_threads(settings.FAISS_OMP_THREADS)
+        self._bm25_pool = ThreadPoolExecutor(max_workers=settings.BM25_THREADS, thread_name_prefix="bm25")
+        
+        # The embedding model and indexes are loaded on first use
+        self._embeddings: Optional[SentenceTransformerEmbeddings] = None
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+        self._write_locks: Dict[str, asyncio.Lock] = {}
+        # Query embeddings are reused when the same query is searched again (e.g. across retries)
+        self._query_embeddings = TTLCache(maxsize=settings.QUERY_EMBEDDING_CACHE_SIZE)
+        # Search results are reused for near-duplicate queries (e.g. overlapping refined queries)
+        self._search_cache = SemanticCache(
+            threshold=settings.SEARCH_CACHE_THRESHOLD,
+            maxsize=settings.SEARCH_CACHE_SIZE
         )
-        self.ensemble_retrievers: Dict[str, EnsembleRetriever] = {}
+        self.category_indexes: Dict[str, CategoryIndex] = {}
+        # mtime of each loaded corpus file; other worker processes may rewrite the index on upload
+        self._index_mtimes: Dict[str, int] = {}
+        self._index_checked: Dict[str, float] = {}
+        # Categories with no index on disk, so searches do not retry the load on every ticket
+        self._missing_categories: set = set()
+        self._loaded: Optional[asyncio.Future] = None
 
-    async def _ensure_index_dir(self):
-        """Ensure the index directory exists asynchronously"""
-        await asyncio.to_thread(os.makedirs, settings.INDEX_DIR, exist_ok=True)
+    @property
+    def embeddings(self) -> SentenceTransformerEmbeddings:
+        """Embedding model, shared by every service instance and loaded on first access"""
+        if self._embeddings is None:
+            self._embeddings = get_embeddings()
+        return self._embeddings
 
-    async def _load_retrievers(self):
-        """Load pre-built retriever objects from disk for each category asynchronously."""
-        for category in settings.CATEGORIES:
-            file_path = os.path.join(settings.INDEX_DIR, f"{category}_retriever.pkl")
-            
-            # Check if file exists asynchronously
-            file_exists = await asyncio.to_thread(os.path.exists, file_path)
-            logger.info(f"file_exists: {file_exists}")
-            if file_exists:
+    def _split_documents(self, documents: List[Document]) -> List[Document]:
+        """
+        Split documents into fixed-stride windows of CHUNK_SIZE embedding-model tokens
+        overlapping by CHUNK_OVERLAP. All documents are tokenized in one batched call
+        and each window is cut from the original text by its token offsets.
+        """
+        offset_mappings = self.embeddings.tokenizer(
+            [document.page_content for document in documents],
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            verbose=False
+        )["offset_mapping"]
+
+        size, overlap = settings.CHUNK_SIZE, settings.CHUNK_OVERLAP
+        chunks = []
+        for document, offsets in zip(documents, offset_mappings):
+            for start in range(0, max(len(offsets) - overlap, 1), size - overlap):
+                window = offsets[start:start + size]
+                if window:
+                    chunks.append(Document(
+                        page_content=document.page_content[window[0][0]:window[-1][1]],
+                        metadata=dict(document.metadata)
+                    ))
+        return chunks
+
+    async def embed_query(self, query: str) -> np.ndarray:
+        """Return the (dim,) L2-normalized embedding of a query"""
+        query_embeddings = await self._embed_queries([query])
+        return query_embeddings[0]
+
+    async def _embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Return the (len(queries), dim) query embeddings, encoding all cache misses in one batch"""
+        # The cache is only touched from the event loop; the forward pass runs in a thread
+        rows = [self._query_embeddings.get(query) for query in queries]
+        misses = list(dict.fromkeys(query for query, row in zip(queries, rows) if row is None))
+
+        if misses:
+            encoded = await asyncio.to_thread(self.embeddings.encode, misses)
+            for query, row in zip(misses, encoded):
+                row.flags.writeable = False
+                self._query_embeddings.set(query, row)
+            fresh = dict(zip(misses, encoded))
+            rows = [row if row is not None else fresh[query] for query, row in zip(queries, rows)]
+
+        return np.stack(rows)
+
+    def _ensure_index_dir(self):
+        """Ensure the index directory exists"""
+        # Called from __init__, which cannot await; a single mkdir does not need a thread
+        os.makedirs(settings.INDEX_DIR, exist_ok=True)
+
+    def _index_paths(self, category: str) -> Dict[str, str]:
+        """Artifact paths for a category's FAISS index, BM25 arrays and chunk corpus"""
+        return {
+            'faiss': os.path.join(settings.INDEX_DIR, f"{category}.faiss"),
+            'chunks': os.path.join(settings.INDEX_DIR, f"{category}_chunks.json"),
+            'bm25': os.path.join(settings.INDEX_DIR, f"{category}_bm25.npz"),
+            'texts': os.path.join(settings.INDEX_DIR, f"{category}_texts.bin"),
+            'text_offsets': os.path.join(settings.INDEX_DIR, f"{category}_text_offsets.npy"),
+            'lock': os.path.join(settings.INDEX_DIR, f"{category}.lock")
+        }
+
+    def _corpus_mtime(self, category: str) -> Optional[int]:
+        """Modification time of the category's corpus file, the last artifact written"""
+        try:
+            return os.stat(self._index_paths(category)['chunks']).st_mtime_ns
+        except OSError:
+            return None
+
+    def _index_changed(self, category: str) -> bool:
+        """True if another process rewrote the category's index since we loaded it, checked at most every INDEX_RELOAD_INTERVAL"""
+        now = time.monotonic()
+        if now - self._index_checked.get(category, 0.0) < settings.INDEX_RELOAD_INTERVAL:
+            return False
+        self._index_checked[category] = now
+        # A single stat; cheap enough to run on the event loop every few seconds
+        mtime = self._corpus_mtime(category)
+        return mtime is not None and mtime != self._index_mtimes.get(category)
+
+    def _read_category_index(self, category: str, reembed: bool = True) -> Optional[CategoryIndex]:
+        """
+        Load a category's artifacts from disk, or None if they do not exist. An index built
+        with another embedding model is re-embedded, or skipped (None) when reembed is False.
+        """
+        paths = self._index_paths(category)
+        if not all(os.path.exists(paths[name]) for name in ('faiss', 'chunks', 'bm25')):
+            return None
+        # Taken before reading, so a rewrite racing with this load is picked up by the next check
+        self._index_mtimes[category] = self._corpus_mtime(category)
+
+        with open(paths['chunks'], "rb") as f:
+            corpus = orjson.loads(f.read())
+        bm25 = BM25Index.load(paths['bm25'])
+        if 'texts' in corpus:
+            # Older indexes kept the chunk texts inline in the JSON corpus
+            texts = ChunkStore.from_texts(corpus['texts'])
+        else:
+            texts = ChunkStore.load(paths['texts'], paths['text_offsets'])
+
+        if all(corpus.get(key) == value for key, value in _embedding_config().items()):
+            # HNSW indexes are always read into memory; FAISS's mmap flag does not apply to them
+            index = faiss.read_index(paths['faiss'])
+            return CategoryIndex(index, texts, corpus['metadatas'], bm25)
+
+        if not reembed:
+            return None
+        # Vectors from another embedding model are not comparable with ours; re-embed the stored chunks
+        logger.warning("Index for category '%s' was built with a different embedding setup; re-embedding.", category)
+        category_index = CategoryIndex(self._build_vector_index(self.embeddings.encode(list(texts))), texts, corpus['metadatas'], bm25)
+        self._write_category_index(category, category_index)
+        return category_index
+
+    def _write_category_index(self, category: str, category_index: CategoryIndex):
+        """Persist a category's FAISS index, BM25 arrays and chunk corpus"""
+        paths = self._index_paths(category)
+        # The old chunk texts may still be memory-mapped and the files may be read concurrently, so never overwrite in place
+        with _atomic_path(paths['faiss']) as tmp_path:
+            faiss.write_index(category_index.index, tmp_path)
+        _atomic_write(paths['bm25'], category_index.bm25.save)
+        _atomic_write(paths['texts'], category_index.texts.save_blob)
+        _atomic_write(paths['text_offsets'], category_index.texts.save_offsets)
+        # Written last: it marks the corpus as the blob format and records the embedding setup
+        _atomic_write(paths['chunks'], lambda f: f.write(orjson.dumps({
+            **_embedding_config(),
+            'metadatas': category_index.metadatas
+        })))
+        # Our own write must not look like another worker's
+        self._index_mtimes[category] = self._corpus_mtime(category)
+
+    def _publish(self, category: str, category_index: CategoryIndex):
+        """
+        Swap in a category's index by rebinding a new mapping. CategoryIndex objects are
+        never mutated after construction, so readers always see a complete old or new index.
+        """
+        self.category_indexes = {**self.category_indexes, category: category_index}
+        self._missing_categories.discard(category)
+        # Cached search results may predate the new index
+        self._search_cache.invalidate_prefix(f"{category}:")
+
+    async def _get_category_index(self, category: str) -> Optional[CategoryIndex]:
+        """Return the index for a category, loading it from disk on first use."""
+        category_index = self.category_indexes.get(category)
+        if (category_index is not None or category in self._missing_categories) and not self._index_changed(category):
+            return category_index
+
+        async with self._load_locks.setdefault(category, asyncio.Lock()):
+            # Another request may have loaded or reloaded it while we waited for the lock
+            if self.category_indexes.get(category) is category_index:
                 try:
-                    # Load retriever asynchronously
-                    def load_retriever():
-                        with open(file_path, "rb") as f:
-                            return pickle.load(f)
-                    
-                    self.ensemble_retrievers[category] = await asyncio.to_thread(load_retriever)
-                    logger.info(f"Successfully loaded retriever for category '{category}'.")
+                    category_index = await asyncio.to_thread(self._read_category_index, category)
                 except Exception as e:
-                    logger.error(f"Failed to load retriever for '{category}': {e}")
-            else:
-                logger.warning(f"No pre-built retriever found for category '{category}'.")
+                    logger.error("Failed to load index for '%s': %s", category, e)
+                    return self.category_indexes.get(category)
+
+                if category_index is None:
+                    if category not in self.category_indexes:
+                        logger.warning("No pre-built index found for category '%s'.", category)
+                        self._missing_categories.add(category)
+                    return self.category_indexes.get(category)
+
+                self._publish(category, category_index)
+                logger.info("Successfully loaded index for category '%s'.", category)
+
+        return self.category_indexes.get(category)
+
+    def preload(self):
+        """
+        Synchronously load every category index, e.g. in a server process before it forks
+        workers, which then share the loaded pages copy-on-write and the mapped chunk texts.
+        The embedding model is not loaded: ONNX Runtime and torch thread pools do not
+        survive fork(), so each worker creates its own. Indexes that need re-embedding are
+        left for the workers too.
+        """
+        for category in settings.CATEGORIES:
+            if category in self.category_indexes:
+                continue
+            category_index = self._read_category_index(category, reembed=False)
+            if category_index is not None:
+                self._publish(category, category_index)
+        logger.info("Preloaded indexes for %d categories.", len(self.category_indexes))
+
+    async def _load_retrievers(self):
+        """Load pre-built indexes for every category concurrently, indexing local knowledge bases where none exist."""
+        async def load_or_index(category: str):
+            if await self._get_category_index(category) is None:
+                await self.index_knowledge_base(category)
+
+        await asyncio.gather(*(load_or_index(category) for category in settings.CATEGORIES))
+
+    async def ensure_loaded(self):
+        """
+        Run _load_retrievers once per service; concurrent callers wait on the same load.
+        A failed load is logged and retried by the next caller; searches meanwhile
+        answer from whichever indexes did load.
+        """
+        loaded = self._loaded
+        # Every node calls this, so skip the shield once the load has succeeded
+        if loaded is not None and loaded.done() and not loaded.cancelled() and loaded.exception() is None:
+            return
+        if loaded is None:
+            self._loaded = loaded = asyncio.ensure_future(self._load_retrievers())
+        try:
+            # A cancelled caller must not cancel the shared load
+            await asyncio.shield(loaded)
+        except asyncio.CancelledError:
+            if loaded.cancelled() and self._loaded is loaded:
+                self._loaded = None
+            raise
+        except Exception as e:
+            if self._loaded is loaded:
+                self._loaded = None
+                logger.error("Failed to load retrievers, will retry on the next request: %s", e)
+
+    async def index_knowledge_base(self, category: str):
+        """Index the .txt files in the category's knowledge base directory, if any"""
+        directory = settings.KNOWLEDGE_BASE_PATHS.get(category)
+        if not directory or not await asyncio.to_thread(os.path.isdir, directory):
+            return
+
+        documents = await asyncio.to_thread(_read_text_files, directory)
+        if documents:
+            logger.info("Indexing %d knowledge base files for category '%s'", len(documents), category)
+            await self.add_documents(documents, category)
+
+    def _update_category_index(self, category: str, chunks: List[Document]) -> Tuple[Optional[CategoryIndex], bool]:
+        """
+        Merge chunks into the category's newest index and persist it. Holds a file lock, so worker
+        processes sharing INDEX_DIR take turns and a knowledge base is only embedded by the first.
+        Returns the index to publish (None if the published one is current) and whether any chunk was new.
+        """
+        with _file_lock(self._index_paths(category)['lock']):
+            published = existing = self.category_indexes.get(category)
+            if existing is None or self._corpus_mtime(category) != self._index_mtimes.get(category):
+                # Merge into the newest corpus on disk, which another worker may have extended
+                existing = self._read_category_index(category) or existing
+
+            category_index = self._build_category_index(category, existing, chunks)
+            if category_index is None:
+                return (existing if existing is not published else None), False
+
+            self._write_category_index(category, category_index)
+            return category_index, True
+
+    def _build_category_index(self, category: str, existing: Optional[CategoryIndex], chunks: List[Document]) -> Optional[CategoryIndex]:
+        """
+        Embed new chunks and merge them into the existing corpus.
+        Returns None when every chunk is already indexed.
+        """
+        seen = set(existing.chunk_hashes) if existing else set()
+        unique_chunks = []
+        for chunk in chunks:
+            chunk_hash = content_key(chunk.page_content)
+            if chunk_hash not in seen:
+                seen.add(chunk_hash)
+                unique_chunks.append(chunk)
+
+        if len(unique_chunks) < len(chunks):
+            logger.info("Skipping %d duplicate chunks for category '%s'.", len(chunks) - len(unique_chunks), category)
+        if not unique_chunks:
+            return None
+        chunks = unique_chunks
+
+        new_texts = [chunk.page_content for chunk in chunks]
+        texts = existing.texts.extend(new_texts) if existing else ChunkStore.from_texts(new_texts)
+        metadatas = existing.metadatas[:] if existing else []
+        metadatas.extend(chunk.metadata for chunk in chunks)
+
+        # Only the new chunks need tokenizing; their rows are appended to the BM25 matrix
+        new_tokens = [_tokenize(text) for text in new_texts]
+        bm25 = existing.bm25.add_documents(new_tokens) if existing else BM25Index.from_tokens(new_tokens)
+
+        # Only the new chunks are embedded. They are added to a copy of the stored index, so searches
+        # on the published one are unaffected; HNSW inserts each new vector into the existing graph
+        if existing is None:
+            index = self._build_vector_index(self.embeddings.encode(new_texts))
+        elif isinstance(existing.index, (faiss.IndexHNSWFlat, faiss.IndexRefineFlat)):
+            index = faiss.clone_index(existing.index)
+            index.add(self.embeddings.encode(new_texts))
+        else:
+            # PCA and the quantizers were trained on the old corpus, so rebuild them from every chunk
+            index = self._build_vector_index(self.embeddings.encode(list(texts)))
+
+        return CategoryIndex(index, texts, metadatas, bm25)
+
+    def _build_vector_index(self, vectors: np.ndarray) -> faiss.Index:
+        """
+        Build a FAISS_INDEX_TYPE index over the given embeddings. With EMBEDDING_PCA_DIM set,
+        vectors are PCA-reduced and re-normalized inside the index, so queries
+        are projected the same way at search time. With FAISS_REFINE_K_FACTOR set,
+        quantized indexes keep exact vectors to rescore their candidates.
+        """
+        dim = vectors.shape[1]
+        pca_dim = settings.EMBEDDING_PCA_DIM
+        # PCA needs more training vectors than output dimensions
+        use_pca = pca_dim is not None and pca_dim < dim and len(vectors) > pca_dim
+
+        index = self._new_vector_index(pca_dim if use_pca else dim, len(vectors))
+        if settings.FAISS_REFINE_K_FACTOR and not isinstance(index, faiss.IndexHNSWFlat):
+            # Search the quantized codes, then rescore the k * k_factor best candidates against exact vectors
+            index = faiss.IndexRefineFlat(index)
+            index.k_factor = settings.FAISS_REFINE_K_FACTOR
+        if use_pca:
+            index = faiss.IndexPreTransform(faiss.NormalizationTransform(pca_dim), index)
+            index.prepend_transform(faiss.PCAMatrix(dim, pca_dim))
+
+        if not index.is_trained:
+            index.train(vectors)
+        index.add(vectors)
+        return index
+
+    def _new_vector_index(self, dim: int, num_vectors: int) -> faiss.Index:
+        """Create an empty index of the configured FAISS_INDEX_TYPE"""
+        # Embeddings are L2-normalized, so inner product ranks like cosine and skips the norm terms
+        metric = faiss.METRIC_INNER_PRODUCT
+        index_type = settings.FAISS_INDEX_TYPE
+
+        # Product quantization needs enough vectors to train its codebooks
+        if index_type == "ivfpq" and num_vectors < settings.IVFPQ_MIN_VECTORS:
+            index_type = "hnsw_sq8"
+
+        if index_type == "ivfpq":
+            quantizer = faiss.IndexFlatIP(dim)
+            nlist = min(256, num_vectors // 39)
+            sub_quantizers = dim // 4 if dim % 4 == 0 else dim
+            return faiss.IndexIVFPQ(quantizer, dim, nlist, sub_quantizers, 8, metric)
+
+        if index_type in ("hnsw_sq8", "hnsw_fp16"):
+            quantizer_type = faiss.ScalarQuantizer.QT_8bit if index_type == "hnsw_sq8" else faiss.ScalarQuantizer.QT_fp16
+            index = faiss.IndexHNSWSQ(dim, quantizer_type, settings.HNSW_M, metric)
+        else:
+            index = faiss.IndexHNSWFlat(dim, settings.HNSW_M, metric)
+        index.hnsw.efConstruction = settings.HNSW_EF_CONSTRUCTION
+        return index
 
     async def add_documents(self, documents: List[Document], category: str):
         """
-        Processes and indexes documents for a specific category, creating a hybrid retriever.
+        Processes and indexes documents for a specific category, creating a hybrid index.
         """
         if not documents:
-            logger.warning(f"No documents provided for category '{category}'.")
+            logger.warning("No documents provided for category '%s'.", category)
             return
-        logger.info(f"documents: {documents[0].page_content}")
-        logger.info(f"Processing {len(documents)} documents for category '{category}'...")
+        logger.info("documents: %.200s", documents[0].page_content)
+        logger.info("Processing %d documents for category '%s'...", len(documents), category)
         
-        # 1. Split documents into manageable chunks
-        chunks = self.text_splitter.split_documents(documents)
-        logger.info(f"Split documents into {len(chunks)} chunks.")
+        # 1. Split documents into chunks of at most CHUNK_SIZE model tokens off the event loop
+        chunks = await asyncio.to_thread(self._split_documents, documents)
+        logger.info("Split documents into %d chunks.", len(chunks))
 
         if not chunks:
-            logger.warning(f"\nNo chunks were created from documents for category '{category}'. The documents might be empty.")
+            logger.warning("No chunks were created from documents for category '%s'. The documents might be empty.", category)
             return
 
-        # 2. Create a keyword-based retriever (BM25)
-        bm25_retriever = BM25Retriever.from_documents(chunks)
-        bm25_retriever.k = 5 # Number of results to fetch
+        # Concurrent uploads to the same category must merge one after another
+        async with self._write_locks.setdefault(category, asyncio.Lock()):
+            # 2. Build the FAISS (vector) and BM25 (keyword) indexes and save them, off the event loop
+            category_index, added = await asyncio.to_thread(self._update_category_index, category, chunks)
+            # Publish even when nothing was added, as another worker may have indexed these chunks
+            if category_index is not None:
+                self._publish(category, category_index)
 
-        # 3. Create a vector-based retriever (FAISS)
-        faiss_vectorstore = FAISS.from_documents(chunks, self.embeddings)
-        faiss_retriever = faiss_vectorstore.as_retriever(search_kwargs={"k": 5})
-
-        # 4. Create the hybrid ensemble retriever
-        # We can adjust weights to prioritize one retriever over the other
-        self.ensemble_retrievers[category] = EnsembleRetriever(
-            retrievers=[bm25_retriever, faiss_retriever],
-            weights=[0.5, 0.5] # 50% keyword-based, 50% vector-based
-        )
+        if not added:
+            logger.info("All chunks for category '%s' are already indexed.", category)
+            return
+        logger.info("Successfully created and saved hybrid index for category '%s'.", category)
 
-        # 5. Save the created retriever to disk for future use asynchronously
-        file_path = os.path.join(settings.INDEX_DIR, f"{category}_retriever.pkl")
-        
-        def save_retriever():
-            with open(file_path, "wb") as f:
-                pickle.dump(self.ensemble_retrievers[category], f)
-        
-        await asyncio.to_thread(save_retriever)
-            
-        logger.info(f"Successfully created and saved hybrid retriever for category '{category}'.")
+    async def search(
+        self,
+        query: str,
+        category: str,
+        k: int = 5,
+        query_embedding: Optional[np.ndarray] = None
+    ) -> Dict[str, Any]:
+        """
+        Performs a hybrid search over the given category, fusing the keyword
+        and vector rankings with Reciprocal Rank Fusion. Pass query_embedding
+        when the same query is searched in several categories.
+        """
+        query_embeddings = None if query_embedding is None else query_embedding.reshape(1, -1)
+        results = await self.search_batch([query], category, k, query_embeddings)
+        return results[0]
 
-    async def search(self, query: str, category: str, k: int = 5) -> Dict[str, Any]:
+    async def search_batch(
+        self,
+        queries: List[str],
+        category: str,
+        k: int = 5,
+        query_embeddings: Optional[np.ndarray] = None
+    ) -> List[Dict[str, Any]]:
         """
-        Performs a hybrid search using the ensemble retriever for the given category.
+        Runs a hybrid search for several queries at once. The queries are
+        embedded in a single batch, unless their (len(queries), dim)
+        embeddings are given, and searched with a single FAISS call.
         """
-        if self.ensemble_retrievers == {}:
-            await self._load_retrievers()
+        category_index = await self._get_category_index(category)
 
-        if category not in self.ensemble_retrievers:
-            return {
+        if category_index is None:
+            return [{
                 'documents': [f"No knowledge base found for category '{category}'. Please build the index first."],
                 'metadata': {
                     'error': 'Retriever not found.',
@@ -120,27 +624,55 @@ class VectorStoreService:
                     'query_used': query,
                     'num_results': 0
                 }
-            }
+            } for query in queries]
 
         try:
-            retriever = self.ensemble_retrievers[category]
-            # Note: EnsembleRetriever does not directly support 'k' parameter in get_relevant_documents.
-            # The 'k' is set when creating the individual retrievers (bm25.k, faiss.as_retriever(k=...)).
-            # The results are combined and duplicates are removed.
-            results = retriever.get_relevant_documents(query)
-            
-            # The number of results might be less than k*2 due to deduplication.
-            return {
-                'documents': [doc.page_content for doc in results],
-                'metadata': {
-                    'category': category,
-                    'query_used': query,
-                    'num_results': len(results)
+            if query_embeddings is None:
+                query_embeddings = await self._embed_queries(queries)
+
+            # Near-identical queries against the same index reuse earlier results
+            cache_key = f"{category}:{k}"
+            results: List[Optional[Dict[str, Any]]] = []
+            for query, embedding in zip(queries, query_embeddings):
+                cached = self._search_cache.lookup(embedding, cache_key)
+                if cached is not None:
+                    cached = {**cached, 'metadata': {**cached['metadata'], 'query_used': query}}
+                results.append(cached)
+            misses = [i for i, result in enumerate(results) if result is None]
+            if not misses:
+                return results
+
+            # Keyword and vector retrieval release the GIL in scipy/FAISS, so run them side by side:
+            # BM25 queries on their own pool, FAISS on one thread that fans out over its OpenMP threads
+            loop = asyncio.get_running_loop()
+            keyword_rankings, vector_rankings = await asyncio.gather(
+                asyncio.gather(*(
+                    loop.run_in_executor(self._bm25_pool, category_index.keyword_search, queries[i], k)
+                    for i in misses
+                )),
+                asyncio.to_thread(category_index.vector_search, query_embeddings[misses], k)
+            )
+
+            for i, keyword_ids, vector_ids in zip(misses, keyword_rankings, vector_rankings):
+                fused_ids = _reciprocal_rank_fusion(
+                    [keyword_ids, vector_ids],
+                    settings.RETRIEVER_WEIGHTS,
+                    len(category_index.texts)
+                )
+                # The number of results might be less than k*2 due to deduplication.
+                results[i] = {
+                    'documents': [category_index.texts[j] for j in fused_ids],
+                    'metadata': {
+                        'category': category,
+                        'query_used': queries[i],
+                        'num_results': len(fused_ids)
+                    }
                 }
-            }
+                self._search_cache.store(query_embeddings[i], cache_key, results[i])
+            return results
         except Exception as e:
-            logger.error(f"Search error in category '{category}': {e}")
-            return {
+            logger.error("Search error in category '%s': %s", category, e)
+            return [{
                 'documents': [f"An error occurred during search for category '{category}'."],
                 'metadata': {
                     'error': str(e),
@@ -148,18 +680,7 @@ class VectorStoreService:
                     'query_used': query,
                     'num_results': 0
                 }
-            }
-
-    async def refine_search(self, original_query: str, category: str, feedback: str, k: int = 5) -> Dict[str, Any]:
-        """
-        Refines a search query based on feedback and performs a new search.
-        """
-        refined_query = f"{original_query} {feedback}"
-        logger.info(f"Refining search for category '{category}' with new query: '{refined_query}'")
-        return await self.search(query=refined_query, category=category, k=k)
-
-
-
+            } for query in queries]
 
     async def refine_search(
         self, 
@@ -190,26 +711,18 @@ class VectorStoreService:
             }
         
         try:
-            logger.info(f"Performing refined search with {len(queries)} queries for category '{category}'")
+            logger.info("Performing refined search with %d queries for category '%s'", len(queries), category)
             
-            # Search with each refined query and collect all documents
+            # Search with all refined queries in one batch and collect all documents
             all_documents = []
+            results = await self.search_batch(queries=queries, category=category, k=k)
             
-            for i, query in enumerate(queries):
-                try:
-                    logger.debug(f"Searching with query {i+1}: '{query}'")
-                    
-                    result = await self.search(query=query, category=category, k=k)
-                    
-                    if result.get('documents'):
-                        all_documents.extend(result['documents'])
-                        logger.debug(f"Query '{query}' returned {len(result['documents'])} documents")
-                    else:
-                        logger.warning(f"Query '{query}' returned no documents")
-                        
-                except Exception as e:
-                    logger.error(f"Error searching with query '{query}': {e}")
-                    continue
+            for query, result in zip(queries, results):
+                if result.get('documents'):
+                    all_documents.extend(result['documents'])
+                    logger.debug("Query '%s' returned %d documents", query, len(result['documents']))
+                else:
+                    logger.warning("Query '%s' returned no documents", query)
             
             if not all_documents:
                 logger.warning("No documents found with any refined query")
@@ -228,7 +741,7 @@ class VectorStoreService:
             # Return top k documents
             final_documents = unique_documents[:10]
             
-            logger.info(f"Refined search completed: {len(final_documents)} unique documents from {len(all_documents)} total results")
+            logger.info("Refined search completed: %d unique documents from %d total results", len(final_documents), len(all_documents))
             
             return {
                 'documents': final_documents,
@@ -242,7 +755,7 @@ class VectorStoreService:
             }
             
         except Exception as e:
-            logger.error(f"Multi-query search failed: {e}")
+            logger.error("Multi-query search failed: %s", e)
             return {
                 'documents': [],
                 'metadata': {
@@ -255,7 +768,9 @@ class VectorStoreService:
 
     def _remove_duplicates(self, documents: List[str]) -> List[str]:
         """
-        Simple deduplication based on document content similarity.
+        Deduplication based on document content similarity.
+        Exact repeats are dropped by content hash, near-duplicates (e.g. the same
+        passage cut at a different offset) by SimHash Hamming distance.
         
         Args:
             documents: List of document strings
@@ -266,13 +781,24 @@ class VectorStoreService:
         
         unique_docs = []
         seen_signatures = set()
+        seen_simhashes: List[int] = []
         
         for doc in documents:
-            # Use first 100 characters as document signature for deduplication
-            signature = doc[:100].lower().strip()
+            # Hash the whole normalized text, so chunks sharing an opening are not merged
+            signature = content_key(doc)
+            if signature in seen_signatures:
+                continue
+            seen_signatures.add(signature)
             
-            if signature not in seen_signatures:
-                seen_signatures.add(signature)
-                unique_docs.append(doc)
+            doc_simhash = simhash(doc)
+            if any((doc_simhash ^ seen).bit_count() <= settings.NEAR_DUPLICATE_MAX_BITS for seen in seen_simhashes):
+                continue
+            seen_simhashes.append(doc_simhash)
+            unique_docs.append(doc)
         
         return unique_docs
+
+@functools.cache
+def get_vector_store_service() -> VectorStoreService:
+    """Process-wide vector store, shared by the API and the workflow nodes"""
+    return VectorStoreService()
@@ -0,0 +1,74 @@
+# utils/cache.py
+import re
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+import numpy as np
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"\w+")
+_BIT_SHIFTS = np.arange(64, dtype=np.uint64)
+# Order numbers, ticket IDs and the like: tokens of 5+ characters that contain a digit
+_ID_LIKE_RE = re.compile(r"\b(?=[\w-]*\d)[\w-]{5,}\b")
+
+def mask_ids(text: str) -> str:
+    """Replace ID-like tokens with '#', so tickets that differ only in IDs share cache keys"""
+    return _ID_LIKE_RE.sub("#", text)
+
+def content_key(*parts: str) -> bytes:
+    """Hash case- and whitespace-normalized text parts into a compact cache key"""
+    normalized = "\0".join(_WHITESPACE_RE.sub(" ", part).strip().lower() for part in parts)
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """
+    64-bit SimHash of a text's word shingles. Texts that share most of their
+    shingles differ in only a few bits, even when their openings differ.
+    """
+    words = _WORD_RE.findall(text.lower())
+    shingles = [" ".join(words[i:i + shingle_size]) for i in range(max(len(words) - shingle_size + 1, 1))]
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little") for shingle in shingles],
+        dtype=np.uint64
+    )
+    # Each bit is set when most shingle hashes have it set
+    bits = ((hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)).sum(axis=0) * 2 > len(hashes)
+    return int((bits.astype(np.uint64) << _BIT_SHIFTS).sum())
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire after `ttl` seconds.
+    Intended for use from a single event loop, so no locking is done.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
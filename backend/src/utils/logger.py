@@ -1,10 +1,11 @@
 # utils/logger.py
+import io
 import os
 import csv
 import logging
 import asyncio
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Iterable, List, Optional, Tuple
 from src.workflow.state import SupportTicket, ClassificationResult, DraftResponse, ReviewResult
 from src.config.settings import settings
 
@@ -20,6 +21,63 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Escalations are appended by one background writer per event loop, so concurrent
+# escalations neither block the loop nor race on writing the CSV header
+_escalation_queue: Optional[asyncio.Queue] = None
+_escalation_writer: Optional[asyncio.Task] = None
+
+def _ensure_escalation_writer() -> asyncio.Queue:
+    """Start the background CSV writer on the running event loop if needed"""
+    global _escalation_queue, _escalation_writer
+    loop = asyncio.get_running_loop()
+    if _escalation_writer is None or _escalation_writer.done() or _escalation_writer.get_loop() is not loop:
+        _escalation_queue = asyncio.Queue()
+        _escalation_writer = loop.create_task(_write_escalations(_escalation_queue))
+    return _escalation_queue
+
+_ESCALATION_FIELDS = (
+    'timestamp', 'ticket_id', 'subject', 'description', 'category', 'classification_confidence',
+    'num_drafts', 'num_reviews', 'final_review_score', 'escalation_reason', 'failed_drafts', 'reviewer_feedback'
+)
+
+def _append_escalation_rows(rows: List[Tuple[Any, ...]]):
+    """Append rows (in _ESCALATION_FIELDS order) to the escalation CSV, writing the header if the file is new"""
+    # Format the whole batch with the C csv writer first, then append it in a single write
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(rows)
+    
+    os.makedirs(os.path.dirname(settings.ESCALATION_LOG_PATH), exist_ok=True)
+    with open(settings.ESCALATION_LOG_PATH, 'a', newline='', encoding='utf-8') as csvfile:
+        if csvfile.tell() == 0:
+            csv.writer(csvfile).writerow(_ESCALATION_FIELDS)
+        csvfile.write(buffer.getvalue())
+
+async def _write_escalations(queue: asyncio.Queue):
+    """Background loop: drain queued escalations and append each batch in one file write"""
+    while True:
+        rows = [await queue.get()]
+        while not queue.empty():
+            rows.append(queue.get_nowait())
+        
+        try:
+            await asyncio.to_thread(_append_escalation_rows, rows)
+            logger.info(f"Escalation log: wrote {len(rows)} row(s)")
+        except Exception as e:
+            logger.error(f"Failed to log escalation: {e}")
+        finally:
+            for _ in rows:
+                queue.task_done()
+
+async def flush_escalations():
+    """Wait until every queued escalation has been written"""
+    if _escalation_queue is not None and _escalation_writer is not None and not _escalation_writer.done():
+        await _escalation_queue.join()
+
+def _compact(texts: Iterable[str], width: int = 100) -> str:
+    """Join truncated texts into one CSV cell"""
+    return ' | '.join(text[:width] + '...' for text in texts)
+
 async def log_escalation(
     ticket: SupportTicket,
     classification: Optional[ClassificationResult],
@@ -27,52 +85,26 @@ async def log_escalation(
     all_reviews: List[ReviewResult],
     reason: str
 ):
-    """Log escalated ticket to CSV file"""
+    """Queue an escalated ticket to be appended to the CSV log"""
     
     try:
-        async def write_to_csv():
-            # Create directory if it doesn't exist
-            await asyncio.to_thread(
-                os.makedirs,
-                os.path.dirname(settings.ESCALATION_LOG_PATH),
-                exist_ok=True
-            )
-            
-            # Check if file exists to determine if we need headers
-            file_exists = await asyncio.to_thread(os.path.exists, settings.ESCALATION_LOG_PATH)
-            
-            # Prepare escalation data
-            escalation_data = {
-                'timestamp': datetime.now().isoformat(),
-                'ticket_id': ticket.ticket_id or 'unknown',
-                'subject': ticket.subject,
-                'description': ticket.description,
-                'category': classification.category if classification else 'unknown',
-                'classification_confidence': classification.confidence if classification else 0.0,
-                'num_drafts': len(all_drafts),
-                'num_reviews': len(all_reviews),
-                'final_review_score': all_reviews[-1].score if all_reviews else 0.0,
-                'escalation_reason': reason,
-                'failed_drafts': ' | '.join([draft.content[:100] + '...' for draft in all_drafts]),
-                'reviewer_feedback': ' | '.join([review.feedback[:100] + '...' for review in all_reviews])
-            }
-            
-            def write_csv_file():
-                with open(settings.ESCALATION_LOG_PATH, 'a', newline='', encoding='utf-8') as csvfile:
-                    fieldnames = escalation_data.keys()
-                    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                    
-                    # Write header if file is new
-                    if not file_exists:
-                        writer.writeheader()
-                    
-                    writer.writerow(escalation_data)
-            
-            # Execute file writing in a separate thread
-            await asyncio.to_thread(write_csv_file)
+        escalation_row = (
+            datetime.now().isoformat(),
+            ticket.ticket_id or 'unknown',
+            ticket.subject,
+            ticket.description,
+            classification.category if classification else 'unknown',
+            classification.confidence if classification else 0.0,
+            len(all_drafts),
+            len(all_reviews),
+            all_reviews[-1].score if all_reviews else 0.0,
+            reason,
+            _compact(draft.content for draft in all_drafts[-settings.ESCALATION_LOG_MAX_ITEMS:]),
+            _compact(review.feedback for review in all_reviews[-settings.ESCALATION_LOG_MAX_ITEMS:])
+        )
         
-        await write_to_csv()
-        logger.info(f"Escalation logged for ticket {ticket.ticket_id}")
+        _ensure_escalation_writer().put_nowait(escalation_row)
+        logger.info(f"Escalation queued for ticket {ticket.ticket_id}")
         
     except Exception as e:
-        logger.error(f"Failed to log escalation: {e}")
\ No newline at end of file
+        logger.error(f"Failed to log escalation: {e}")
@@ -0,0 +1,69 @@
+# utils/validation.py
+import re
+from typing import Any, Dict, List
+
+from src.config.settings import settings
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+UNPROFESSIONAL_WORDS = (
+    "stupid", "dumb", "idiot", "whatever", "shut up", "damn", "hell", "crap",
+    "not my problem", "your fault", "obviously", "calm down"
+)
+
+HELPFUL_INDICATORS = (
+    "please", "you can", "steps", "follow", "contact", "help", "assist",
+    "let us know", "reach out", "here's how", "navigate", "go to"
+)
+
+# Drafts that give up or hit the LLM fallback always need a real review
+FALLBACK_PHRASES = (
+    "i need to escalate", "technical difficulties", "connect you with a human agent"
+)
+
+_PHRASE_KINDS = {
+    **{phrase: "unprofessional" for phrase in UNPROFESSIONAL_WORDS},
+    **{phrase: "helpful" for phrase in HELPFUL_INDICATORS},
+    **{phrase: "fallback" for phrase in FALLBACK_PHRASES}
+}
+# Every phrase list in one alternation, so a draft is scanned once; longest phrases first, whole words only
+_PHRASE_RE = re.compile(r"\b(?:%s)\b" % "|".join(
+    re.escape(phrase).replace(r"\ ", r"\s+") for phrase in sorted(_PHRASE_KINDS, key=len, reverse=True)
+))
+_WHITESPACE_RE = re.compile(r"\s+")
+# Distinct helpful phrases a draft needs for the full helpfulness share of its score
+_HELPFUL_PHRASES_FOR_FULL_SCORE = 3
+
+class ResponseValidator:
+    """Cheap local checks on a draft response, used to skip the LLM review for clearly good drafts"""
+
+    @staticmethod
+    def validate_response_quality(response: str, context: str) -> Dict[str, Any]:
+        """Score a draft between 0 and 1 and list the issues found"""
+        issues: List[str] = []
+        lowered = response.lower()
+        phrases = {_WHITESPACE_RE.sub(" ", match) for match in _PHRASE_RE.findall(lowered)}
+        found = {_PHRASE_KINDS[phrase] for phrase in phrases}
+
+        length_ok = settings.HEURISTIC_REVIEW_MIN_CHARS <= len(response) <= settings.HEURISTIC_REVIEW_MAX_CHARS
+        if not length_ok:
+            issues.append("Response length out of bounds")
+        if "unprofessional" in found:
+            issues.append("Unprofessional language")
+        if "helpful" not in found:
+            issues.append("No actionable guidance")
+        if "fallback" in found:
+            issues.append("Fallback or escalation response")
+
+        # Share of the draft's longer words that also occur in the retrieved context
+        words = {word for word in _WORD_RE.findall(lowered) if len(word) > 4}
+        context_words = set(_WORD_RE.findall(context.lower()))
+        grounding = len(words & context_words) / len(words) if words else 0.0
+        if grounding < settings.HEURISTIC_REVIEW_MIN_GROUNDING:
+            issues.append("Response not grounded in the retrieved context")
+
+        # Grounding dominates; a few distinct helpful phrases and a sensible length make up the rest
+        helpfulness = min(1.0, sum(_PHRASE_KINDS[phrase] == "helpful" for phrase in phrases) / _HELPFUL_PHRASES_FOR_FULL_SCORE)
+        score = 0.6 * grounding + 0.25 * helpfulness + 0.15 * length_ok
+        score = max(0.0, score - 0.25 * len(issues))
+        return {"score": round(score, 3), "grounding": round(grounding, 3), "issues": issues}
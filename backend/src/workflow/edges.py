@@ -1,11 +1,23 @@
 # workflow/edges.py
 import logging
-from typing import Literal, Dict, Any
+from typing import Literal, Dict, Any, Tuple
 from src.workflow.state import SupportAgentState
 from src.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# State fields that must be set before entering each node
+_REQUIRED_STATE: Dict[str, Tuple[str, ...]] = {
+    "classify_and_retrieve": ("ticket",),
+    "fast_path": ("ticket",),
+    "draft_generation": ("ticket", "classification", "rag_results"),
+    "review": ("ticket", "classification", "current_draft"),
+    "context_refinement": ("ticket", "classification", "review_result"),
+    "redraft_generation": ("ticket", "classification", "review_result", "refined_rag_results"),
+    "escalation": ("ticket",),
+    "final_output": ("current_draft",)
+}
+
 class SupportEdges:
     """Edge conditions and routing logic for the support agent graph"""
     
@@ -32,6 +44,19 @@ class SupportEdges:
         logger.info(f"Draft rejected, retrying (attempt {state['retry_count'] + 1}/{settings.MAX_RETRIES})")
         return "retry"
     
+    @staticmethod
+    def route_input(state: SupportAgentState) -> Literal["fast_path", "classify_and_retrieve"]:
+        """Use the fused classify-and-draft call when enabled"""
+        return "fast_path" if settings.FAST_PATH_ENABLED else "classify_and_retrieve"
+    
+    @staticmethod
+    def route_fast_path(state: SupportAgentState) -> Literal["review", "classify_and_retrieve"]:
+        """Review the fused draft, or fall back to the regular path if there is none"""
+        if state.get("current_draft") is None:
+            logger.info("Fast path produced no draft, falling back to classification")
+            return "classify_and_retrieve"
+        return "review"
+    
     @staticmethod
     def is_processing_complete(state: SupportAgentState) -> bool:
         """Check if processing is complete (either resolved or escalated)"""
@@ -50,22 +75,10 @@ class SupportEdges:
     def validate_state_transition(from_node: str, to_node: str, state: SupportAgentState) -> bool:
         """Validate that state transition is valid"""
         
-        required_state = {
-            "classification": ["ticket"],
-            "rag_retrieval": ["ticket", "classification"],
-            "draft_generation": ["ticket", "classification", "rag_results"],
-            "review": ["ticket", "classification", "current_draft"],
-            "context_refinement": ["ticket", "classification", "review_result"],
-            "redraft_generation": ["ticket", "classification", "review_result", "refined_rag_results"],
-            "escalation": ["ticket"],
-            "final_output": ["current_draft"]
-        }
-        
-        if to_node in required_state:
-            for required_field in required_state[to_node]:
-                if required_field not in state or state[required_field] is None:
-                    logger.error(f"Missing required field {required_field} for transition to {to_node}")
-                    return False
+        for required_field in _REQUIRED_STATE.get(to_node, ()):
+            if state.get(required_field) is None:
+                logger.error(f"Missing required field {required_field} for transition to {to_node}")
+                return False
         
         return True
 
@@ -74,4 +87,11 @@ def review_decision(state: SupportAgentState) -> str:
     """Edge condition function to determine next step after review"""
     return SupportEdges.should_retry(state)
 
- 
\ No newline at end of file
+ 
+def input_decision(state: SupportAgentState) -> str:
+    """Edge condition function to choose the fast or regular path after input"""
+    return SupportEdges.route_input(state)
+
+def fast_path_decision(state: SupportAgentState) -> str:
+    """Edge condition function to determine next step after the fast path"""
+    return SupportEdges.route_fast_path(state)
@@ -1,12 +1,12 @@
 # workflow/graph.py
 import logging
+import functools
 from typing import Dict, Any
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import InMemorySaver
 
 from src.workflow.state import SupportAgentState, SupportTicket
 from src.workflow.nodes import SupportNodes
-from src.workflow.edges import review_decision
+from src.workflow.edges import review_decision, input_decision, fast_path_decision
 
 logger = logging.getLogger(__name__)
 
@@ -14,40 +14,65 @@ class SupportAgentGraph:
     """Main support agent graph orchestrator"""
     
     def __init__(self):
-        self.nodes = SupportNodes()
-        self.graph = None
-        self.app = None
-        self._build_graph()
+        # Every instance shares the nodes and compiled app built on first use
+        self.nodes, self.graph, self.app = self._compiled()
     
-    def _build_graph(self):
+    @classmethod
+    @functools.cache
+    def _compiled(cls):
+        """Build and compile the workflow once per process"""
+        nodes = SupportNodes()
+        graph = cls._build_graph(nodes)
+        app = graph.compile()
+        logger.info("Support agent graph compiled successfully")
+        return nodes, graph, app
+    
+    @staticmethod
+    def _build_graph(nodes: SupportNodes) -> StateGraph:
         """Build the LangGraph workflow"""
         
         # Create the graph
-        self.graph = StateGraph(SupportAgentState)
+        graph = StateGraph(SupportAgentState)
         
         # Add nodes
-        self.graph.add_node("input", self.nodes.input_node)
-        self.graph.add_node("classification", self.nodes.classification_node)
-        self.graph.add_node("rag_retrieval", self.nodes.rag_retrieval_node)
-        self.graph.add_node("draft_generation", self.nodes.draft_generation_node)
-        self.graph.add_node("review", self.nodes.review_node)
-        self.graph.add_node("generate_queries", self.nodes.generate_queries_node)
-        self.graph.add_node("context_refinement", self.nodes.context_refinement_node)
-        self.graph.add_node("redraft_generation", self.nodes.redraft_generation_node)
-        self.graph.add_node("escalation", self.nodes.escalation_node)
-        self.graph.add_node("final_output", self.nodes.final_output_node)
+        graph.add_node("input", nodes.input_node)
+        graph.add_node("classify_and_retrieve", nodes.classify_and_retrieve_node)
+        graph.add_node("fast_path", nodes.fast_path_node)
+        graph.add_node("draft_generation", nodes.draft_generation_node)
+        graph.add_node("review", nodes.review_node)
+        graph.add_node("generate_queries", nodes.generate_queries_node)
+        graph.add_node("context_refinement", nodes.context_refinement_node)
+        graph.add_node("redraft_generation", nodes.redraft_generation_node)
+        graph.add_node("escalation", nodes.escalation_node)
+        graph.add_node("final_output", nodes.final_output_node)
         
         # Set entry point
-        self.graph.set_entry_point("input")
+        graph.set_entry_point("input")
         
         # Add edges - Linear flow first
-        self.graph.add_edge("input", "classification")
-        self.graph.add_edge("classification", "rag_retrieval")
-        self.graph.add_edge("rag_retrieval", "draft_generation")
-        self.graph.add_edge("draft_generation", "review")
+        graph.add_conditional_edges(
+            "input",
+            input_decision,
+            {
+                "fast_path": "fast_path",
+                "classify_and_retrieve": "classify_and_retrieve"
+            }
+        )
+        graph.add_edge("classify_and_retrieve", "draft_generation")
+        graph.add_edge("draft_generation", "review")
+        
+        # Fast path: classification and draft come from one call; fall back if it fails
+        graph.add_conditional_edges(
+            "fast_path",
+            fast_path_decision,
+            {
+                "review": "review",
+                "classify_and_retrieve": "classify_and_retrieve"
+            }
+        )
         
         # Conditional edge after review
-        self.graph.add_conditional_edges(
+        graph.add_conditional_edges(
             "review",
             review_decision,
             {
@@ -58,19 +83,15 @@ class SupportAgentGraph:
         )
         
         # Retry flow with generate_queries
-        self.graph.add_edge("generate_queries", "context_refinement")
-        self.graph.add_edge("context_refinement", "redraft_generation")
-        self.graph.add_edge("redraft_generation", "review")
+        graph.add_edge("generate_queries", "context_refinement")
+        graph.add_edge("context_refinement", "redraft_generation")
+        graph.add_edge("redraft_generation", "review")
         
         # End nodes
-        self.graph.add_edge("escalation", END)
-        self.graph.add_edge("final_output", END)
+        graph.add_edge("escalation", END)
+        graph.add_edge("final_output", END)
         
-        # Compile with checkpointer for persistence
-        memory = InMemorySaver()
-        self.app = self.graph.compile()
-        
-        logger.info("Support agent graph compiled successfully")
+        return graph
     
     async def process_ticket(
         self, 
@@ -140,9 +161,9 @@ class SupportAgentGraph:
 Support Agent Graph Structure:
 =============================
 
-[Input] → [Classification] → [RAG Retrieval] → [Draft Generation] → [Review]
-                                                                         ↓
-[Final Output] ←← [Approved?] ←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←
+[Input] → [Classification + RAG Retrieval] → [Draft Generation] → [Review]
+                                                                       ↓
+[Final Output] ←← [Approved?] ←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←
       ↑                 ↓ [Rejected & Retries < Max]
       ↑                 ↓
 [Escalation] ←← [Max Retries?] ←← [Generate Queries] → [Context Refinement] → [Redraft Generation]
@@ -155,7 +176,8 @@ Key Features:
 - Context refinement using generated queries
 - Automatic escalation when retries exhausted
 - Full audit trail of all drafts and reviews
-- Category-specific RAG retrieval
+- Category-specific RAG retrieval, run concurrently with classification
+- Optional fast path (FAST_PATH_ENABLED) that classifies and drafts in one LLM call
 """
         return visualization
     
@@ -1,25 +1,61 @@
 # workflow/nodes.py
+import re
+import time
+import asyncio
 import logging
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
 from src.workflow.state import SupportAgentState, SupportTicket, ClassificationResult, RAGResult, ReviewResult, DraftResponse
-from src.services.llm_service import LLMService
-from src.services.vector_store import VectorStoreService
+from src.services.llm_service import get_llm_service
+from src.services.vector_store import get_vector_store_service
+from src.services.semantic_cache import SemanticCache
+from src.config.settings import settings
 from src.utils.logger import log_escalation
+from src.utils.validation import ResponseValidator
+from src.utils.cache import mask_ids
 
 logger = logging.getLogger(__name__)
 
+# Review issues that a redraft can fix without retrieving new context
+_STYLE_ONLY_RE = re.compile(r"(?i)\b(?:tone|grammar|format(?:ting)?|signature|wording|spelling)\b")
+_SHORT_FEEDBACK_CHARS = 40
+
+def _cache_text(ticket: SupportTicket) -> str:
+    """Ticket text for the semantic cache, with order numbers and other IDs masked"""
+    return mask_ids(f"{ticket.subject} {ticket.description}")
+
+def _is_style_only(review: ReviewResult) -> bool:
+    """True when the review only asks for style changes, so new queries and context would not help"""
+    if not all(_STYLE_ONLY_RE.search(issue) for issue in review.issues):
+        return False
+    feedback = review.feedback.strip()
+    return len(feedback) < _SHORT_FEEDBACK_CHARS or _STYLE_ONLY_RE.search(feedback) is not None
+
 class SupportNodes:
     def __init__(self):
-        self.llm_service = LLMService()
-        self.vector_service = VectorStoreService()
-        self._initialized = False
+        # Shared with the API app in the same process, so indexes, caches and HTTP pools exist once
+        self.llm_service = get_llm_service()
+        self.vector_service = get_vector_store_service()
+        self.response_cache = SemanticCache(
+            threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            maxsize=settings.SEMANTIC_CACHE_SIZE
+        )
     
     async def _ensure_initialized(self):
         """Ensure vector stores are initialized"""
-        if not self._initialized:
-            self.vector_service
-            self._initialized = True
+        await self.vector_service.ensure_loaded()
+    
+    async def _search_all_categories(self, query: str, k: int) -> List[Any]:
+        """Search every category concurrently with one query embedding; failed searches come back as exceptions"""
+        try:
+            query_embedding = await self.vector_service.embed_query(query)
+        except Exception as e:
+            return [e] * len(settings.CATEGORIES)
+        return await asyncio.gather(
+            *(self.vector_service.search(query=query, category=category, k=k, query_embedding=query_embedding)
+              for category in settings.CATEGORIES),
+            return_exceptions=True
+        )
     
     def _create_fallback_draft(self, state: SupportAgentState, message: str = None) -> DraftResponse:
         """Create a fallback draft response"""
@@ -29,9 +65,14 @@ class SupportNodes:
         return DraftResponse(
             content=message,
             version=len(state["all_drafts"]) + 1,
-            timestamp=datetime.now().isoformat()
+            timestamp=time.time_ns()
         )
     
+    def _elapsed_seconds(self, state: SupportAgentState) -> float:
+        """Seconds since input_node ran, from the monotonic clock (the ISO start time is for display)"""
+        start = state.get("processing_start_monotonic")
+        return time.monotonic() - start if start is not None else 0
+    
     async def input_node(self, state: SupportAgentState) -> Dict[str, Any]:
         """Entry point - process input ticket"""
         logger.info(f"[INPUT_NODE] Processing ticket: {state['ticket']['ticket_id']}")
@@ -53,82 +94,133 @@ class SupportNodes:
         return {
             "ticket": ticket,
             "processing_start_time": start_time,
+            "processing_start_monotonic": time.monotonic(),
             "retry_count": 0,
             "all_drafts": [],
             "all_reviews": []
         }
     
-    async def classification_node(self, state: SupportAgentState) -> Dict[str, Any]:
-        """Classify the support ticket"""
-        logger.info(f"[CLASSIFICATION_NODE] Classifying ticket: {state['ticket'].ticket_id}")
+    async def classify_and_retrieve_node(self, state: SupportAgentState) -> Dict[str, Any]:
+        """Classify the support ticket and retrieve context for its category"""
+        logger.info(f"[CLASSIFY_RETRIEVE_NODE] Classifying ticket: {state['ticket'].ticket_id}")
+        
+        await self._ensure_initialized()
         
         if not state["ticket"]:
             raise ValueError("No ticket found in state")
         
-        try:
-            result = await self.llm_service.classify_ticket(
+        # Create search query from ticket
+        query = f"{state['ticket'].subject} {state['ticket'].description}"
+        
+        # Retrieval only needs the category to pick an index, so search every category while
+        # the classification call is in flight and keep the classified category's results
+        classification_result, search_results = await asyncio.gather(
+            self.llm_service.classify_ticket(
                 subject=state["ticket"].subject,
                 description=state["ticket"].description
-            )
-            
+            ),
+            self._search_all_categories(query, k=5)
+        )
+        
+        try:
             classification = ClassificationResult(
-                category=result["category"],
-                confidence=result["confidence"],
-                reasoning=result["reasoning"]
+                category=classification_result["category"],
+                confidence=classification_result["confidence"],
+                reasoning=classification_result["reasoning"]
             )
-            
-            logger.info(f"[CLASSIFICATION_NODE] Classified as: {classification.category} (confidence: {classification.confidence})")
-            
-            return {"classification": classification}
-            
         except Exception as e:
-            logger.error(f"[CLASSIFICATION_NODE] Classification failed: {e}")
+            logger.error(f"[CLASSIFY_RETRIEVE_NODE] Classification failed: {e}")
             # Fallback classification
             classification = ClassificationResult(
                 category="general",
                 confidence=0.5,
                 reasoning=str(e)
             )
-            return {"classification": classification}
-    
-    async def rag_retrieval_node(self, state: SupportAgentState) -> Dict[str, Any]:
-        """Retrieve relevant context using RAG"""
-        logger.info(f"[RAG_NODE] Retrieving context for category: {state['classification'].category}")
-        
-        await self._ensure_initialized()
         
-        if not state["ticket"] or not state["classification"]:
-            raise ValueError("Missing ticket or classification in state")
-        
-        # Create search query from ticket
-        query = f"{state['ticket'].subject} {state['ticket'].description}"
+        logger.info(f"[CLASSIFY_RETRIEVE_NODE] Classified as: {classification.category} (confidence: {classification.confidence})")
         
         try:
-            result = await self.vector_service.search(
-                query=query,
-                category=state["classification"].category,
-                k=5
-            )
-
+            result = dict(zip(settings.CATEGORIES, search_results)).get(classification.category)
+            if result is None:
+                result = await self.vector_service.search(query=query, category=classification.category, k=5)
+            if isinstance(result, Exception):
+                raise result
+            
             rag_result = RAGResult(
                 documents=result["documents"],
                 metadata=result["metadata"],
                 query_used=result['metadata']['query_used']
             )
             
-            logger.info(f"[RAG_NODE] Retrieved {len(rag_result.documents)} documents")
-            
-            return {"rag_results": rag_result}
+            logger.info(f"[CLASSIFY_RETRIEVE_NODE] Retrieved {len(rag_result.documents)} documents")
             
         except Exception as e:
-            logger.error(f"[RAG_NODE] RAG retrieval failed: {e}")
+            logger.error(f"[CLASSIFY_RETRIEVE_NODE] RAG retrieval failed: {e}")
             # Fallback context
-            fallback_result = RAGResult(
-                documents=[f"General assistance for {state['classification'].category} issues. Please contact support for specific help."],
-                metadata={"category": state['classification'].category, "error": str(e)},
+            rag_result = RAGResult(
+                documents=[f"General assistance for {classification.category} issues. Please contact support for specific help."],
+                metadata={"category": classification.category, "error": str(e)},
                 query_used=query
             )
-            return {"rag_results": fallback_result}
+        
+        return {"classification": classification, "rag_results": rag_result}
+    
+    async def fast_path_node(self, state: SupportAgentState) -> Dict[str, Any]:
+        """Classify the ticket and draft its response in a single LLM call"""
+        logger.info(f"[FAST_PATH_NODE] Classifying and drafting ticket: {state['ticket'].ticket_id}")
+        
+        await self._ensure_initialized()
+        
+        query = f"{state['ticket'].subject} {state['ticket'].description}"
+        
+        # The category is not known yet, so give the model the top chunks of every category
+        search_results = await self._search_all_categories(query, k=settings.FAST_PATH_DOCS_PER_CATEGORY)
+        documents_by_category = {
+            category: result["documents"]
+            for category, result in zip(settings.CATEGORIES, search_results)
+            if not isinstance(result, Exception) and "error" not in result["metadata"]
+        }
+        context = "\n\n".join(
+            f"[{category}]\n" + "\n".join(documents)
+            for category, documents in documents_by_category.items()
+        )
+        
+        result = await self.llm_service.classify_and_draft(
+            subject=state["ticket"].subject,
+            description=state["ticket"].description,
+            context=context
+        )
+        
+        # An empty update sends the ticket down the regular classify-and-retrieve path
+        if result is None or result["category"] not in settings.CATEGORIES:
+            logger.warning("[FAST_PATH_NODE] Fused call failed or returned an unknown category, using the regular path")
+            return {}
+        
+        classification = ClassificationResult(
+            category=result["category"],
+            confidence=result["confidence"],
+            reasoning=result["reasoning"]
+        )
+        # The reviewer sees only the chunks of the chosen category, the ones the draft may use
+        rag_result = RAGResult(
+            documents=documents_by_category.get(classification.category, []),
+            metadata={"category": classification.category, "query_used": query, "fast_path": True},
+            query_used=query
+        )
+        draft = DraftResponse(
+            content=result["response"].strip(),
+            version=len(state["all_drafts"]) + 1,
+            timestamp=time.time_ns()
+        )
+        
+        logger.info(f"[FAST_PATH_NODE] Classified as: {classification.category}, drafted v{draft.version} ({len(draft.content)} chars)")
+        
+        return {
+            "classification": classification,
+            "rag_results": rag_result,
+            "current_draft": draft,
+            "all_drafts": state["all_drafts"] + [draft]
+        }
     
     async def draft_generation_node(self, state: SupportAgentState) -> Dict[str, Any]:
         """Generate initial response draft"""
@@ -138,9 +230,53 @@ class SupportNodes:
             raise ValueError("Missing required state for draft generation")
         
         # Prepare context from RAG results
-        context = "\n".join(state['rag_results'].documents)
+        context = state['rag_results'].context
         
         try:
+            # Start from the approved response of a near-identical earlier ticket; it is still reviewed
+            if settings.SEMANTIC_CACHE_ENABLED:
+                query_embedding = await self.vector_service.embed_query(_cache_text(state["ticket"]))
+                draft_content = self.response_cache.lookup(query_embedding, state["classification"].category)
+                if draft_content is not None:
+                    draft = DraftResponse(
+                        content=draft_content,
+                        version=len(state["all_drafts"]) + 1,
+                        timestamp=time.time_ns()
+                    )
+                    logger.info(f"[DRAFT_NODE] Reused cached approved response as draft v{draft.version}")
+                    return {
+                        "current_draft": draft,
+                        "all_drafts": state["all_drafts"] + [draft],
+                        "cached_draft": True
+                    }
+            
+            # Draft and self-review in one call; the review node then reuses the self-review
+            if settings.FUSED_REVIEW_ENABLED:
+                result = await self.llm_service.generate_and_review(
+                    subject=state["ticket"].subject,
+                    description=state["ticket"].description,
+                    category=state["classification"].category,
+                    context=context
+                )
+                if result is not None:
+                    draft = DraftResponse(
+                        content=result["response"].strip(),
+                        version=len(state["all_drafts"]) + 1,
+                        timestamp=time.time_ns()
+                    )
+                    review = ReviewResult(
+                        approved=result["approved"],
+                        feedback=result["feedback"],
+                        score=result["score"],
+                        issues=result["issues"]
+                    )
+                    logger.info(f"[DRAFT_NODE] Generated self-reviewed draft v{draft.version} ({len(draft.content)} chars)")
+                    return {
+                        "current_draft": draft,
+                        "all_drafts": state["all_drafts"] + [draft],
+                        "cached_review": review
+                    }
+            
             draft_content = await self.llm_service.generate_draft(
                 subject=state["ticket"].subject,
                 description=state["ticket"].description,
@@ -151,7 +287,7 @@ class SupportNodes:
             draft = DraftResponse(
                 content=draft_content,
                 version=len(state["all_drafts"]) + 1,
-                timestamp=datetime.now().isoformat()
+                timestamp=time.time_ns()
             )
             
             # Update drafts list
@@ -180,7 +316,34 @@ class SupportNodes:
         if not all([state['ticket'], state['classification'], state['current_draft'], state['rag_results']]):
             raise ValueError("Missing required state for review")
         
-        context = "\n".join(state["rag_results"].documents)
+        # A fused draft reviewed itself
+        if state.get("cached_review") is not None:
+            review = state["cached_review"]
+            logger.info(f"[REVIEW_NODE] Reusing existing review: {'APPROVED' if review.approved else 'REJECTED'} (score: {review.score})")
+            return {
+                "review_result": review,
+                "all_reviews": state["all_reviews"] + [review],
+                "cached_review": None
+            }
+        
+        context = state["rag_results"].context
+        
+        # Drafts that clearly pass local checks skip the LLM review; cached drafts were written for another ticket
+        cached_draft = state.get("cached_draft", False)
+        if settings.HEURISTIC_REVIEW_THRESHOLD is not None and not cached_draft:
+            quality = ResponseValidator.validate_response_quality(state["current_draft"].content, context)
+            if quality["score"] >= settings.HEURISTIC_REVIEW_THRESHOLD and not quality["issues"]:
+                review = ReviewResult(
+                    approved=True,
+                    feedback=f"Approved by heuristic checks (grounding: {quality['grounding']})",
+                    score=quality["score"],
+                    issues=[]
+                )
+                logger.info(f"[REVIEW_NODE] Heuristic approval (score: {review.score})")
+                return {
+                    "review_result": review,
+                    "all_reviews": state["all_reviews"] + [review]
+                }
         
         try:
             result = await self.llm_service.review_draft(
@@ -203,23 +366,33 @@ class SupportNodes:
             
             logger.info(f"[REVIEW_NODE] Review result: {'APPROVED' if review.approved else 'REJECTED'} (score: {review.score})")
             
+            if review.approved and settings.SEMANTIC_CACHE_ENABLED and not cached_draft:
+                query_embedding = await self.vector_service.embed_query(_cache_text(state["ticket"]))
+                self.response_cache.store(
+                    query_embedding,
+                    state["classification"].category,
+                    state["current_draft"].content
+                )
+            
             return {
                 "review_result": review,
-                "all_reviews": updated_reviews
+                "all_reviews": updated_reviews,
+                "cached_draft": False
             }
             
         except Exception as e:
             logger.error(f"[REVIEW_NODE] Review failed: {e}")
-            # Fallback approval on system error
+            # Fallback approval on system error; a cached draft answers another ticket, so it is redrafted instead
             review = ReviewResult(
-                approved=True,
-                feedback="System error during review, auto-approved",
+                approved=not cached_draft,
+                feedback="System error during review, auto-approved" if not cached_draft else "System error during review of a cached response",
                 score=0.7,
                 issues=[]
             )
             return {
                 "review_result": review,
-                "all_reviews": state["all_reviews"] + [review]
+                "all_reviews": state["all_reviews"] + [review],
+                "cached_draft": False
             }
     
     async def generate_queries_node(self, state: SupportAgentState) -> Dict[str, Any]:
@@ -231,6 +404,10 @@ class SupportNodes:
         
         query = f"{state['ticket'].subject} {state['ticket'].description}"
         
+        if _is_style_only(state["review_result"]):
+            logger.info("[QUERY_NODE] Style-only feedback, skipping query generation")
+            return {"refined_queries": [query]}
+        
         try:
             # Extract key points from review feedback
             feedback = state["review_result"].feedback
@@ -265,6 +442,11 @@ class SupportNodes:
         if not all([state['ticket'], state['classification'], state['review_result'], state['refined_queries']]):
             raise ValueError("Missing required state for context refinement")
         
+        # Style fixes do not need different documents; redraft against the original context
+        if _is_style_only(state["review_result"]) and state["rag_results"]:
+            logger.info("[REFINEMENT_NODE] Style-only feedback, reusing the original context")
+            return {"refined_rag_results": state["rag_results"]}
+        
         try:
             # Use the improved refine_search that handles multiple queries
             result = await self.vector_service.refine_search(
@@ -297,7 +479,7 @@ class SupportNodes:
             raise ValueError("Missing required state for redraft generation")
         
         # Use refined context
-        context = "\n".join(state['refined_rag_results'].documents)
+        context = state['refined_rag_results'].context
         
         try:
             draft_content = await self.llm_service.generate_draft(
@@ -313,7 +495,7 @@ class SupportNodes:
             draft = DraftResponse(
                 content=draft_content,
                 version=len(state["all_drafts"]) + 1,
-                timestamp=datetime.now().isoformat()
+                timestamp=time.time_ns()
             )
             
             # Update drafts list
@@ -364,10 +546,7 @@ class SupportNodes:
         )
         
         end_time = datetime.now().isoformat()
-        processing_time = (
-            datetime.fromisoformat(end_time) - 
-            datetime.fromisoformat(state["processing_start_time"])
-        ).total_seconds() if state["processing_start_time"] else 0
+        processing_time = self._elapsed_seconds(state)
         
         logger.info(f"[ESCALATION_NODE] Ticket escalated after {processing_time:.2f}s")
         
@@ -387,10 +566,7 @@ class SupportNodes:
             raise ValueError("No current draft for final output")
         
         end_time = datetime.now().isoformat()
-        processing_time = (
-            datetime.fromisoformat(end_time) - 
-            datetime.fromisoformat(state["processing_start_time"])
-        ).total_seconds() if state["processing_start_time"] else 0
+        processing_time = self._elapsed_seconds(state)
         
         logger.info(f"[FINAL_NODE] Ticket resolved successfully in {processing_time:.2f}s")
         
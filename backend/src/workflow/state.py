@@ -1,7 +1,11 @@
 # workflow/state.py
+from datetime import datetime
+from functools import cached_property
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, field_serializer, field_validator
 from langgraph.graph import MessagesState
+from src.config.settings import settings
+from src.utils.cache import content_key
 
 class SupportTicket(BaseModel):
     subject: str
@@ -17,6 +21,29 @@ class RAGResult(BaseModel):
     documents: List[str]
     metadata: Dict[str, Any]
     query_used: str
+    
+    @cached_property
+    def context(self) -> str:
+        """
+        Documents joined into one prompt context, built once per result and reused across retries.
+        Repeated documents are dropped and the best-ranked ones are kept up to RAG_CONTEXT_MAX_CHARS.
+        """
+        parts: List[str] = []
+        seen = set()
+        remaining = settings.RAG_CONTEXT_MAX_CHARS
+        for document in self.documents:
+            key = content_key(document)
+            if key in seen:
+                continue
+            seen.add(key)
+            # Always keep (part of) the top document, then only documents that fit whole
+            if parts and len(document) > remaining:
+                continue
+            parts.append(document[:remaining])
+            remaining -= len(parts[-1]) + 1
+            if remaining <= 0:
+                break
+        return "\n".join(parts)
 
 class ReviewResult(BaseModel):
     approved: bool
@@ -24,10 +51,42 @@ class ReviewResult(BaseModel):
     score: float
     issues: List[str]
 
+class ClassifiedDraft(BaseModel):
+    category: str
+    confidence: float
+    reasoning: str
+    response: str
+
+class ReviewedDraft(BaseModel):
+    response: str
+    approved: bool
+    score: float
+    feedback: str
+    issues: List[str]
+
 class DraftResponse(BaseModel):
     content: str
     version: int
-    timestamp: str
+    timestamp: int  # nanoseconds since the epoch (time.time_ns())
+    
+    @property
+    def timestamp_iso(self) -> str:
+        """Creation time as an ISO 8601 string, formatted only when displayed"""
+        return datetime.fromtimestamp(self.timestamp / 1e9).isoformat()
+    
+    @field_validator("timestamp", mode="before")
+    @classmethod
+    def _parse_timestamp(cls, value: Any) -> Any:
+        """Accept the ISO string drafts serialize to, so dumped state validates back"""
+        if isinstance(value, str):
+            parsed = datetime.fromisoformat(value)
+            return int(parsed.timestamp()) * 1_000_000_000 + parsed.microsecond * 1000
+        return value
+    
+    @field_serializer("timestamp")
+    def _serialize_timestamp(self, timestamp: int) -> str:
+        """Serialize as an ISO 8601 string, so graph state and API output keep their format"""
+        return self.timestamp_iso
 
 class SupportAgentState(MessagesState):
     # Input
@@ -44,6 +103,8 @@ class SupportAgentState(MessagesState):
     # Draft Generation
     current_draft: Optional[DraftResponse] = None
     all_drafts: List[DraftResponse] = []
+    cached_review: Optional[ReviewResult] = None  # review that came with the draft (fused self-review)
+    cached_draft: bool = False  # draft reused from the semantic cache; always gets an LLM review
     
     # Review Process
     review_result: Optional[ReviewResult] = None
@@ -60,5 +121,6 @@ class SupportAgentState(MessagesState):
     
     # Metadata
     processing_start_time: Optional[str] = None
+    processing_start_monotonic: Optional[float] = None
     processing_end_time: Optional[str] = None
     total_processing_time: Optional[float] = None
\ No newline at end of file